@@ -112,25 +112,8 @@ function formatAppointmentDate(raw) {
 // ========== Appointments: stats + chart (Step 6) ==========
 
 function updateAppointmentsStatsFromList() {
-  const card = document.getElementById("stat-appointments");
-  if (!card) return;
-  card.textContent = appointments.length;   // total, not 7-day window
-
-  const now = new Date();
-  const sevenDaysAgo = new Date();
-  sevenDaysAgo.setDate(now.getDate() - 6);
-  sevenDaysAgo.setHours(0, 0, 0, 0);
-
-  let count = 0;
-
-  for (const appt of appointments) {
-    if (!appt.datetime) continue;
-    const d = new Date(appt.datetime);
-    if (Number.isNaN(d.getTime())) continue;
-    if (d >= sevenDaysAgo && d <= now) count++;
-  }
-
-  card.textContent = count;
+  // Header count comes from the server-side counters, not the loaded list.
+  scheduleDashboardSummary();
 }
 
 function normalizeStatus(s) {
@@ -221,9 +204,7 @@ async function fetchCases() {
 }
 
 function updateSavedCasesStat(cases) {
-  const el = document.getElementById("stat-cases");
-  if (!el) return;
-  el.textContent = cases.length;
+  scheduleDashboardSummary();
 }
 
 function updateSavedCasesTable(cases) {
@@ -266,6 +247,17 @@ async function loadSavedCasesFromApi() {
   updateSavedCasesTable(savedCases);
 }
 
+async function fetchLead(id) {
+  try {
+    const res = await fetch(`${API_BASE}/forms/${id}`);
+    if (!res.ok) return null;
+    return await res.json();
+  } catch (err) {
+    console.error("Error fetching lead:", err);
+    return null;
+  }
+}
+
 async function updateLead(id, payload = {}) {
   return fetch(`${API_BASE}/forms/${id}`, {
     method: "PUT",
@@ -782,6 +774,33 @@ function renderFilesTable(files) {
       `;
     })
     .join("");
+
+  prefetchDownloadLinks(files.filter((f) => f.file_url).map((f) => f.id));
+}
+
+// One POST /files/download per rendered page instead of one GET per click.
+// Links carry their expiry so stale ones fall back to the single-file call.
+async function prefetchDownloadLinks(ids) {
+  for (let i = 0; i < ids.length; i += 100) {
+    try {
+      const res = await fetch(`${API_BASE}/files/download`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ ids: ids.slice(i, i + 100) }),
+      });
+      if (!res.ok) throw new Error(`Batch download URLs failed: HTTP ${res.status}`);
+      const data = await res.json();
+      Object.entries(data.urls || {}).forEach(([id, link]) => {
+        const a = document.querySelector(`.file-open-link[data-id="${id}"]`);
+        if (!a) return;
+        a.href = link.download_url;
+        a.dataset.expires = String(Date.now() + (link.expires_in - 10) * 1000);
+      });
+    } catch (err) {
+      console.error("Error prefetching download URLs:", err);
+      return;
+    }
+  }
 }
 
 async function loadFilesFromApi(reset = true) {
@@ -808,12 +827,19 @@ async function createFileApi(payload) {
   return res.json();
 }
 
-async function updateFileApi(id, payload) {
+// `version` is the one the edit started from; the API answers 409 if the
+// file changed since, instead of overwriting someone else's edit.
+async function updateFileApi(id, payload, version) {
+  const headers = { "Content-Type": "application/json", Prefer: "return=minimal" };
+  if (version !== undefined) headers["If-Match"] = `"v${version}"`;
   const res = await fetch(`${API_BASE}/files/${id}`, {
     method: "PUT",
-    headers: { "Content-Type": "application/json" },
+    headers,
     body: JSON.stringify(payload),
   });
+  if (res.status === 409) {
+    throw new Error("This file was changed by someone else. Reload and try again.");
+  }
   if (!res.ok) throw new Error(`Update file failed: HTTP ${res.status}`);
   return res.json();
 }
@@ -868,6 +894,116 @@ function openFileModal(file) {
   }
 }
 
+// Large files: the API answers POST /files/upload with an upload_id and a
+// batch of presigned part URLs. Parts go up in parallel; the upload id is
+// kept in localStorage so a retried submit resumes instead of restarting.
+const UPLOAD_CONCURRENCY = 4;
+const PART_ATTEMPTS = 3;
+
+function uploadResumeKey(file) {
+  return `upload:${file.name}:${file.size}:${file.lastModified}`;
+}
+
+async function uploadPart(file, upload, part) {
+  const start = (part.part_number - 1) * upload.part_size;
+  const blob = file.slice(start, start + upload.part_size);
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const res = await fetch(part.url, { method: "PUT", body: blob });
+      if (!res.ok) throw new Error(`Part ${part.part_number}: HTTP ${res.status}`);
+      return;
+    } catch (err) {
+      if (attempt >= PART_ATTEMPTS) throw err;
+    }
+  }
+}
+
+async function uploadMultipart(file, upload) {
+  let batch = upload;
+  while (batch.parts.length) {
+    const queue = [...batch.parts];
+    const workers = Array.from({ length: UPLOAD_CONCURRENCY }, async () => {
+      while (queue.length) await uploadPart(file, upload, queue.shift());
+    });
+    await Promise.all(workers);
+
+    // Fetch URLs for whatever is still missing (next batch, or retries).
+    const res = await fetch(`${API_BASE}/files/upload/${upload.upload_id}`);
+    if (!res.ok) throw new Error(`Upload status failed: HTTP ${res.status}`);
+    batch = await res.json();
+  }
+
+  const res = await fetch(`${API_BASE}/files/upload/${upload.upload_id}/complete`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({}),
+  });
+  if (!res.ok) throw new Error(`Complete upload failed: HTTP ${res.status}`);
+}
+
+// Each file is titled after its filename; the shared form fields (type,
+// category, status, description, tags) apply to all of them.
+async function uploadFilesBatch(files, shared) {
+  const presignRes = await fetch(`${API_BASE}/files/upload/batch`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      files: files.map((f) => ({
+        filename: f.name,
+        content_type: f.type || "application/octet-stream",
+        size: f.size,
+      })),
+    }),
+  });
+  if (!presignRes.ok) throw new Error(`Batch presign failed: HTTP ${presignRes.status}`);
+  const batch = await presignRes.json();
+
+  const queue = batch.files.map((slot, i) => ({ slot, file: files[i] }));
+  const uploaded = [];
+  const workers = Array.from({ length: UPLOAD_CONCURRENCY }, async () => {
+    while (queue.length) {
+      const { slot, file } = queue.shift();
+      try {
+        if (slot.multipart) {
+          await uploadMultipart(file, slot.multipart);
+        } else {
+          const res = await fetch(slot.upload_url, {
+            method: "PUT",
+            headers: { "Content-Type": file.type || "application/octet-stream" },
+            body: file,
+          });
+          if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        }
+        uploaded.push({ ...shared, file_id: slot.file_id, title: file.name });
+      } catch (err) {
+        console.error(`Upload of ${file.name} failed:`, err);
+      }
+    }
+  });
+  await Promise.all(workers);
+  if (!uploaded.length) throw new Error("No files were uploaded");
+
+  const res = await fetch(`${API_BASE}/files/upload/batch/${batch.batch_id}/finalize`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ files: uploaded }),
+  });
+  if (!res.ok) throw new Error(`Finalize failed: HTTP ${res.status}`);
+  const data = await res.json();
+  const failed = data.results.filter((r) => r.status !== "ok").length + files.length - uploaded.length;
+  if (failed) alert(`${failed} of ${files.length} files could not be saved. See console for details.`);
+}
+
+function closeFileModal() {
+  const modalEl = document.getElementById("fileModal");
+  if (modalEl && window.bootstrap) {
+    const modal = bootstrap.Modal.getInstance(modalEl);
+    modal && modal.hide();
+  } else if (modalEl) {
+    modalEl.style.display = "none";
+  }
+}
+
 function setupFileForm() {
   const form = document.getElementById("file-form");
   if (!form) return;
@@ -885,29 +1021,67 @@ function setupFileForm() {
     console.log("initial fileUrl =", fileUrl);
 
     try {
+      // Several files: one batch presign, parallel PUTs, one finalize.
+      if (fileInput?.files?.length > 1 && !editingFileId) {
+        await uploadFilesBatch(Array.from(fileInput.files), {
+          type: document.getElementById("file-type").value.trim() || "file",
+          category: document.getElementById("file-category").value.trim(),
+          status: document.getElementById("file-status").value.trim(),
+          description: document.getElementById("file-description").value.trim(),
+          tags: document
+            .getElementById("file-tags")
+            .value.split(",")
+            .map((t) => t.trim())
+            .filter((t) => t),
+        });
+        closeFileModal();
+        fileInput.value = "";
+        await loadFilesFromApi(true);
+        return;
+      }
+
       // 1) If a file is selected, upload to S3 via presigned URL
       if (selectedFile) {
-        const presignRes = await fetch(`${API_BASE}/files/upload`, {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({
-            filename: selectedFile.name,
-            content_type: selectedFile.type || "application/octet-stream",
-          }),
-        });
+        const resumeKey = uploadResumeKey(selectedFile);
+        const resumeId = localStorage.getItem(resumeKey);
+        let presignData = null;
+
+        if (resumeId) {
+          const resumeRes = await fetch(`${API_BASE}/files/upload/${resumeId}`);
+          if (resumeRes.ok) presignData = await resumeRes.json();
+          else localStorage.removeItem(resumeKey);
+        }
 
-        if (!presignRes.ok) {
-          throw new Error(`Presign failed: HTTP ${presignRes.status}`);
+        if (!presignData) {
+          const presignRes = await fetch(`${API_BASE}/files/upload`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({
+              filename: selectedFile.name,
+              content_type: selectedFile.type || "application/octet-stream",
+              size: selectedFile.size,
+            }),
+          });
+
+          if (!presignRes.ok) {
+            throw new Error(`Presign failed: HTTP ${presignRes.status}`);
+          }
+          presignData = await presignRes.json();
         }
-        const presignData = await presignRes.json();
 
-        await fetch(presignData.upload_url, {
-          method: "PUT",
-          headers: {
-            "Content-Type": selectedFile.type || "application/octet-stream",
-          },
-          body: selectedFile,
-        });
+        if (presignData.upload_id) {
+          localStorage.setItem(resumeKey, presignData.upload_id);
+          await uploadMultipart(selectedFile, presignData);
+          localStorage.removeItem(resumeKey);
+        } else {
+          await fetch(presignData.upload_url, {
+            method: "PUT",
+            headers: {
+              "Content-Type": selectedFile.type || "application/octet-stream",
+            },
+            body: selectedFile,
+          });
+        }
 
         fileUrl = presignData.file_url;
         document.getElementById("file-url").value = fileUrl;
@@ -929,18 +1103,13 @@ function setupFileForm() {
       };
 
       if (editingFileId) {
-        await updateFileApi(editingFileId, payload);
+        const editing = filesCache.find((f) => f.id === editingFileId);
+        await updateFileApi(editingFileId, payload, editing?.version);
       } else {
         await createFileApi(payload);
       }
 
-      const modalEl = document.getElementById("fileModal");
-      if (modalEl && window.bootstrap) {
-        const modal = bootstrap.Modal.getInstance(modalEl);
-        modal && modal.hide();
-      } else if (modalEl) {
-        modalEl.style.display = "none";
-      }
+      closeFileModal();
 
       if (fileInput) fileInput.value = "";
       await loadFilesFromApi(true);
@@ -965,6 +1134,11 @@ function setupFilesTableActions() {
       const id = openLink.dataset.id;
       if (!id) return;
 
+      if (openLink.dataset.expires && Number(openLink.dataset.expires) > Date.now()) {
+        window.open(openLink.href, "_blank");
+        return;
+      }
+
       try {
         const res = await fetch(`${API_BASE}/files/download/${id}`);
         if (!res.ok) throw new Error(`Download URL failed: HTTP ${res.status}`);
@@ -1033,9 +1207,7 @@ async function initFilesSection() {
 }
 
 function updateFilesStatFromCache() {
-  const el = document.getElementById("stat-files");
-  if (!el) return;
-  el.textContent = filesCache.length || 0;
+  scheduleDashboardSummary();
 }
 
 // ========== Leads: fetch from backend & 7-day stats (Step 4B) ==========
@@ -1062,28 +1234,46 @@ async function fetchForms() {
   }
 }
 
-// card: New Leads (7 days)
-function updateLeadStatsFromForms(forms) {
-  const now = new Date();
-  const sevenDaysAgo = new Date();
-  sevenDaysAgo.setDate(now.getDate() - 6); // last 7 days including today
-
-  let leadsLast7 = 0;
+// ========== Header stat cards: one read of GET /dashboard/summary ==========
+// The lists on the page are paged, so counting them would under-report;
+// the backend keeps the totals as counters updated on every write.
+let dashboardSummaryTimer = null;
+let dashboardSummaryEtag = null;
 
-  for (const item of forms) {
-    if (!item.created_at) continue;
-    const created = new Date(item.created_at);
-    if (Number.isNaN(created.getTime())) continue;
+function setStat(id, value) {
+  const el = document.getElementById(id);
+  if (el && value !== undefined) el.textContent = value;
+}
 
-    if (created >= sevenDaysAgo && created <= now) {
-      leadsLast7++;
+async function loadDashboardSummary() {
+  try {
+    const headers = dashboardSummaryEtag ? { "If-None-Match": dashboardSummaryEtag } : {};
+    const res = await fetch(`${API_BASE}/dashboard/summary`, { headers });
+    if (res.status === 304) return;
+    if (!res.ok) {
+      console.error("Failed to fetch dashboard summary", res.status);
+      return;
     }
+    dashboardSummaryEtag = res.headers.get("ETag");
+    const summary = await res.json();
+    setStat("stat-leads", summary.forms?.last_7_days);          // New Leads (7 days)
+    setStat("stat-appointments", summary.appointments?.last_7_days);
+    setStat("stat-cases", summary.cases?.total);
+    setStat("stat-files", summary.files?.total);
+  } catch (err) {
+    console.error("Error fetching dashboard summary:", err);
   }
+}
 
-  const statEl = document.getElementById("stat-leads");
-  if (statEl) {
-    statEl.textContent = leadsLast7;
-  }
+// Writes elsewhere on the page call this; bursts collapse into one request.
+function scheduleDashboardSummary() {
+  clearTimeout(dashboardSummaryTimer);
+  dashboardSummaryTimer = setTimeout(loadDashboardSummary, 300);
+}
+
+// card: New Leads (7 days)
+function updateLeadStatsFromForms(forms) {
+  scheduleDashboardSummary();
 }
 
 async function loadDashboardData() {
@@ -1299,16 +1489,20 @@ function setupLeadsTableActions() {
     if (!form) return;
 
     if (viewBtn) {
-      alert(
-        `Lead details\n\n` +
-          `Name: ${form.name || "-"}\n` +
-          `Email: ${form.email || "-"}\n` +
-          `Phone: ${form.phone || "-"}\n` +
-          `Case type: ${getCaseTypeFromForm(form)}\n` +
-          `Received: ${formatDateTimeReadable(form.created_at)}\n\n` +
-          `Message:\n${form.message || form.details || "-"}\n\n` +
-          `Internal note:\n${form.internal_note || "-"}`
-      );
+      // GET /forms only returns summary columns; load the message on demand
+      fetchLead(id).then((full) => {
+        const lead = { ...form, ...(full || {}) };
+        alert(
+          `Lead details\n\n` +
+            `Name: ${lead.name || "-"}\n` +
+            `Email: ${lead.email || "-"}\n` +
+            `Phone: ${lead.phone || "-"}\n` +
+            `Case type: ${getCaseTypeFromForm(lead)}\n` +
+            `Received: ${formatDateTimeReadable(lead.created_at)}\n\n` +
+            `Message:\n${lead.message || lead.details || "-"}\n\n` +
+            `Internal note:\n${lead.internal_note || "-"}`
+        );
+      });
       if (e.target.classList.contains("btn-lead-reopen")) {
         if (!confirm("Reopen this lead and move it back to In Progress?")) return;
 
@@ -1435,6 +1629,9 @@ document.addEventListener("DOMContentLoaded", () => {
   setupLeadsFilters();
   setupLeadsTableActions();
 
+  // Header numbers first: a single small read.
+  loadDashboardSummary();
+
   // override dummy leads with real data
   loadDashboardData();
 
@@ -1773,6 +1970,14 @@ function buildAppointmentUpdatePayload(appt) {
   };
 }
 
+// 409 from the API: the slot overlaps existing bookings.
+function slotConflictMessage(data) {
+  const times = (data.conflicts || [])
+    .map((c) => formatAppointmentDate(c.starts_at))
+    .join(", ");
+  return `This time overlaps another appointment${times ? ` (${times})` : ""}.`;
+}
+
 async function createAppointment(payload) {
   try {
     const res = await fetch(`${API_BASE}/appointments`, {
@@ -1783,7 +1988,7 @@ async function createAppointment(payload) {
     const data = await res.json().catch(() => ({}));
     if (!res.ok) {
       console.error("Failed to create appointment", res.status, data);
-      alert("Error saving appointment.");
+      alert(data.error === "slot_conflict" ? slotConflictMessage(data) : "Error saving appointment.");
       return null;
     }
     return data;
@@ -1804,7 +2009,7 @@ async function updateAppointment(id, updates) {
     const data = await res.json().catch(() => ({}));
     if (!res.ok) {
       console.error("Failed to update appointment", res.status, data);
-      alert("Error updating appointment.");
+      alert(data.error === "slot_conflict" ? slotConflictMessage(data) : "Error updating appointment.");
       return null;
     }
     return data;
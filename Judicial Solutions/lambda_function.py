@@ -1,26 +1,48 @@
 import os
 import json
 import uuid
+import hmac
+import base64
+import hashlib
 import logging
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import unquote_plus
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import bisect
+import csv
 import decimal
+import gzip
+import heapq
+import io
+import math
+import re
+from collections import OrderedDict, defaultdict
 
-import boto3
+# boto3 itself is imported lazily (see "AWS clients" below): it dominates
+# import time, and OPTIONS preflights never need it.
 from botocore.exceptions import ClientError
 
 # -------------------------
 # Config / logging
 # -------------------------
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(level=LOG_LEVEL)
+if not logging.getLogger().handlers:
+    # The Lambda runtime installs its own handler; this only runs locally.
+    logging.basicConfig()
 logger = logging.getLogger("judicial_single_lambda")
+logger.setLevel(LOG_LEVEL)
 
 FILES_BUCKET = (
     os.environ.get("FILES_BUCKET")
     or os.environ.get("FILES_BUCKET_NAME")
     or "judicial-files-bucket"
 )
+FILES_URL_PREFIX = f"https://{FILES_BUCKET}.s3.ap-south-1.amazonaws.com/"
 
 TABLE_FORMS = os.environ.get("TABLE_FORMS", "judicial-forms")
 TABLE_CASES = os.environ.get("TABLE_CASES", "judicial-cases")
@@ -28,19 +50,444 @@ TABLE_MESSAGES = os.environ.get("TABLE_MESSAGES", "judicial-messages")
 TABLE_APPOINTMENTS = os.environ.get("TABLE_APPOINTMENTS", "judicial-appointments")
 TABLE_SERVICES = os.environ.get("TABLE_SERVICES", "judicial-services")
 TABLE_FILES = os.environ.get("TABLE_FILES", "judicial-files")
+TABLE_SEARCH = os.environ.get("TABLE_SEARCH", "judicial-search")
+TABLE_UPLOADS = os.environ.get("TABLE_UPLOADS", "judicial-uploads")
+TABLE_AUDIT = os.environ.get("TABLE_AUDIT", "judicial-audit")
+TABLE_COUNTERS = os.environ.get("TABLE_COUNTERS", "judicial-counters")
 
-s3 = boto3.client("s3")
-dynamodb = boto3.resource("dynamodb")
+# HMAC key for pagination cursors: a long random string, the same for every
+# instance and kept across deploys so outstanding cursors stay valid.
+# Required on Lambda; without it only routes that issue or read a cursor
+# fail (500), everything else keeps working.
+CURSOR_SECRET = os.environ.get("CURSOR_SECRET", "")
 
-TABLE_MAP = {
-    "forms": dynamodb.Table(TABLE_FORMS),
-    "cases": dynamodb.Table(TABLE_CASES),
-    "messages": dynamodb.Table(TABLE_MESSAGES),
-    "appointments": dynamodb.Table(TABLE_APPOINTMENTS),
-    "services": dynamodb.Table(TABLE_SERVICES),
-    "files": dynamodb.Table(TABLE_FILES),
+# One declarative schema per resource. Everything resource-specific lives
+# here: the table, the fields accepted on create (type, default, required,
+# max_length), the secondary indexes, the list-view summary projection and
+# whether DELETE leaves a tombstone, the full-text "search" fields with
+# their ranking weights, the dashboard "counters" kept beyond the total, and
+# for bookable resources the "calendar" slot fields. Adding a resource means
+# adding an entry.
+#
+# Indexes are listed in the order the router tries them. "pk" is the index
+# partition key and "sk" its sort key. Every item is written with a constant
+# "resource" attribute, so the resource-* index can list a whole table in
+# sort-key order with a Query instead of a Scan.
+RESOURCE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "forms": {
+        "table": TABLE_FORMS,
+        "soft_delete": True,
+        "fields": {
+            "name": {"type": "str", "required": True, "max_length": 200},
+            "email": {"type": "str", "required": True, "max_length": 254},
+            "phone": {"type": "str", "max_length": 40},
+            "message": {"type": "str", "max_length": 5000},
+            "case_type": {"type": "str", "max_length": 100},
+        },
+        "indexes": [
+            {"name": "form_id-created_at-index", "pk": "form_id", "sk": "created_at"},
+            {"name": "resource-created_at-index", "pk": "resource", "sk": "created_at"},
+        ],
+        "summary": [
+            "id", "form_id", "name", "email", "phone", "case_type", "type",
+            "status", "read", "internal_note", "created_at", "updated_at",
+        ],
+        "search": {"name": 3, "email": 2, "case_type": 2, "message": 1},
+        "counters": {"unread": True, "daily": "created_at"},
+    },
+    "cases": {
+        "table": TABLE_CASES,
+        "fields": {
+            "case_number": {"type": "str", "required": True, "max_length": 100},
+            "title": {"type": "str", "required": True, "max_length": 300},
+            "description": {"type": "str", "max_length": 20000},
+            "court": {"type": "str", "max_length": 200},
+            "judgment_date": {"type": "str", "max_length": 40},
+        },
+        "indexes": [
+            {"name": "court-created_at-index", "pk": "court", "sk": "created_at"},
+            {"name": "resource-created_at-index", "pk": "resource", "sk": "created_at"},
+        ],
+        "summary": [
+            "id", "case_number", "title", "court", "date", "judgment_date",
+            "tags", "status", "read", "created_at", "updated_at",
+        ],
+        "search": {"case_number": 3, "title": 3, "court": 2, "description": 1},
+    },
+    "messages": {
+        "table": TABLE_MESSAGES,
+        "fields": {
+            "sender": {"type": "str", "required": True, "max_length": 254},
+            "recipient": {"type": "str", "required": True, "max_length": 254},
+            "body": {"type": "str", "required": True, "max_length": 10000},
+        },
+        "indexes": [
+            {"name": "recipient-created_at-index", "pk": "recipient", "sk": "created_at"},
+            {"name": "resource-created_at-index", "pk": "resource", "sk": "created_at"},
+        ],
+    },
+    "appointments": {
+        "table": TABLE_APPOINTMENTS,
+        "fields": {
+            "client": {"type": "str", "required": True, "max_length": 200},
+            "case_type": {"type": "str", "max_length": 100},
+            "datetime": {"type": "str", "required": True, "max_length": 40},
+            "mode": {"type": "str", "max_length": 40},
+            "status": {"type": "str", "max_length": 40},
+            "notes": {"type": "str", "max_length": 5000},
+        },
+        "indexes": [
+            {"name": "status-datetime-index", "pk": "status", "sk": "datetime"},
+            {"name": "month-starts_at-index", "pk": "month", "sk": "starts_at"},
+            {"name": "resource-datetime-index", "pk": "resource", "sk": "datetime"},
+        ],
+        "counters": {"daily": "day"},
+        # Slots are [starts_at, ends_at); statuses listed in "free" release it.
+        "calendar": {"start": "datetime", "minutes": "duration_minutes", "free": ["cancelled"]},
+    },
+    "services": {
+        "table": TABLE_SERVICES,
+        "fields": {
+            "name": {"type": "str", "required": True, "max_length": 200},
+            "category": {"type": "str", "max_length": 100},
+            "description": {"type": "str", "max_length": 5000},
+            "shown": {"type": "bool", "default": True},
+        },
+        "indexes": [
+            {"name": "category-created_at-index", "pk": "category", "sk": "created_at"},
+            {"name": "resource-created_at-index", "pk": "resource", "sk": "created_at"},
+        ],
+        "search": {"name": 3, "category": 2, "description": 1},
+    },
+    "files": {
+        "table": TABLE_FILES,
+        "fields": {
+            "title": {"type": "str", "required": True, "max_length": 300},
+            "type": {"type": "str", "required": True, "max_length": 40},  # template/file/etc
+            "file_url": {"type": "str", "required": True, "max_length": 2048},  # S3 or any URL
+            "description": {"type": "str", "max_length": 5000},
+            "category": {"type": "str", "max_length": 100},
+            "status": {"type": "str", "default": "active", "max_length": 40},
+            "tags": {"type": "list", "max_length": 50},
+            # Object key in FILES_BUCKET; derived from file_url when omitted.
+            "s3_key": {"type": "str", "max_length": 1024},
+        },
+        "indexes": [
+            {"name": "category-created_at-index", "pk": "category", "sk": "created_at"},
+            {"name": "resource-created_at-index", "pk": "resource", "sk": "created_at"},
+        ],
+        "search": {"title": 3, "tags": 2, "category": 2, "description": 1},
+        "counters": {"group_by": "category"},
+    },
 }
 
+# Read path: "client" serves lists and item reads through the low-level
+# DynamoDB client and the wire converters below; "resource" uses boto3's
+# Table API throughout.
+DATA_ACCESS_MODE = os.environ.get("DATA_ACCESS_MODE", "client")
+
+# Table objects, created on first use by choose_table() and kept for the
+# life of the container.
+TABLE_MAP: Dict[str, Any] = {}
+
+RESOURCE_INDEXES: Dict[str, List[Dict[str, str]]] = {
+    resource: schema.get("indexes", []) for resource, schema in RESOURCE_SCHEMAS.items()
+}
+
+INDEXED_ATTRS = {
+    resource: {attr for idx in indexes for attr in (idx["pk"], idx["sk"])}
+    for resource, indexes in RESOURCE_INDEXES.items()
+}
+
+# Query-string keys that control paging rather than filter items.
+LIST_CONTROL_PARAMS = {
+    "limit", "last", "order", "scan", "include_deleted", "estimate", "fields", "from", "to",
+}
+
+# Default list-view projections ("summary" columns) for resources whose items
+# carry large text blobs. ?fields=a,b overrides, ?fields=all disables.
+LIST_PROJECTIONS: Dict[str, List[str]] = {
+    resource: schema["summary"]
+    for resource, schema in RESOURCE_SCHEMAS.items()
+    if schema.get("summary")
+}
+MAX_PROJECTION_FIELDS = 40
+
+# Attributes stored as booleans, so list filters can match ?read=false.
+BOOL_FIELDS: Dict[str, set] = {
+    resource: {"read", "is_deleted"}
+    | {name for name, spec in schema.get("fields", {}).items() if spec["type"] == "bool"}
+    for resource, schema in RESOURCE_SCHEMAS.items()
+}
+FIELD_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Upper bound on reads spent filling one page past tombstones.
+MAX_PAGE_READS = int(os.environ.get("MAX_PAGE_READS", "10"))
+# Larger ?limit= values are clamped; keeps pages well under the 6 MB
+# Lambda response cap.
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "500"))
+
+# Pagination cursors are signed so clients cannot forge ExclusiveStartKeys.
+# Local runs without CURSOR_SECRET get a random key, so their cursors only
+# verify within the same process; a deployed function gets none.
+_CURSOR_KEY: Optional[bytes] = CURSOR_SECRET.encode("utf-8") or (
+    None if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") else os.urandom(32)
+)
+CURSOR_VERSION = 1
+
+# Resources whose DELETE marks a tombstone instead of removing the item.
+SOFT_DELETE_RESOURCES = {r for r, schema in RESOURCE_SCHEMAS.items() if schema.get("soft_delete")}
+
+# Attributes build_resource_item() sets itself; payload keys cannot override.
+RESERVED_FIELDS = {"id", "resource", "form_id", "created_at", "read", "audit", "version"}
+
+# Rough per-item size cap, checked while normalizing and before any write.
+# DynamoDB's hard limit is 400 KB; a request body cap guards the batch paths.
+MAX_ITEM_BYTES = int(os.environ.get("MAX_ITEM_BYTES", str(64 * 1024)))
+MAX_BODY_BYTES = int(os.environ.get("MAX_BODY_BYTES", str(1024 * 1024)))
+
+# Batch endpoints: DynamoDB per-call limits and our own per-request cap.
+BATCH_WRITE_CHUNK = 25
+BATCH_GET_CHUNK = 100
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "500"))
+BATCH_MAX_ATTEMPTS = 6
+
+# Bulk flag/status updates: items per TransactWriteItems call and the write
+# budget (WCU per second) bulk jobs may consume on a table.
+TRANSACT_CHUNK = 25
+BULK_WRITE_RATE = float(os.environ.get("BULK_WRITE_RATE", "50"))
+
+# Fields the bulk PATCH endpoints may set, with the type they accept.
+BULK_UPDATE_FIELDS = {"read": (bool, "boolean"), "status": (str, "string")}
+
+# Parallel scans: default segment count, and the share of a provisioned
+# table's read capacity a scan may use. On-demand tables report no capacity,
+# so SCAN_READ_RATE (RCU per second) applies instead.
+SCAN_SEGMENTS = int(os.environ.get("SCAN_SEGMENTS", "4"))
+SCAN_CAPACITY_SHARE = float(os.environ.get("SCAN_CAPACITY_SHARE", "0.5"))
+SCAN_READ_RATE = float(os.environ.get("SCAN_READ_RATE", "200"))
+
+# Exports stream pages into an S3 multipart upload; memory use is bounded by
+# one part buffer regardless of table size. They run as jobs outside the API
+# request: POST starts one (a "kind": "export" record in TABLE_UPLOADS plus
+# an async invocation of this function) and GET /exports/{id} polls it.
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_PAGE_SIZE = 500
+EXPORT_PART_BYTES = 8 * 1024 * 1024  # S3 minimum part size is 5 MiB
+EXPORT_URL_EXPIRY = 900
+EXPORT_JOB_DAYS = 2
+# Fallback run limit for export jobs when no Lambda context says how long
+# the worker has; a job still "running" past its deadline is reported failed.
+EXPORT_JOB_TIMEOUT = int(os.environ.get("EXPORT_JOB_TIMEOUT", "900"))
+
+# Full-text search. TABLE_SEARCH holds one forward-index record per document
+# (pk "resource", sk "id", term frequencies in "terms"), with a
+# resource-indexed_at-index GSI for incremental refresh. Warm containers keep
+# the inverted index in memory and pull changes at most every
+# SEARCH_REFRESH_SECONDS; SEARCH_CLOCK_SKEW widens that window for writes
+# stamped by other containers.
+SEARCH_FIELDS = {r: schema["search"] for r, schema in RESOURCE_SCHEMAS.items() if schema.get("search")}
+SEARCH_REFRESH_SECONDS = float(os.environ.get("SEARCH_REFRESH_SECONDS", "5"))
+SEARCH_CLOCK_SKEW = 5.0
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_PREFIX_EXPANSIONS = 20
+SEARCH_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SEARCH_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it of on or that the this to was were will with".split()
+)
+
+# Uploads. Files at or above MULTIPART_THRESHOLD go through an S3 multipart
+# upload whose state lives in TABLE_UPLOADS (id, TTL attribute "expires_at"),
+# so an interrupted browser upload can ask which parts are still missing.
+# Part URLs are handed out PART_URL_BATCH at a time.
+MULTIPART_THRESHOLD = int(os.environ.get("MULTIPART_THRESHOLD", str(32 * 1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(5 * 1024 ** 3)))
+MIN_PART_BYTES = 8 * 1024 * 1024
+MAX_PARTS = 10000
+PART_URL_BATCH = 100
+PART_URL_EXPIRY = 3600
+UPLOAD_STATE_DAYS = 7
+
+# Download URLs are presigned for DOWNLOAD_URL_EXPIRY seconds and handed out
+# again from the warm cache until only DOWNLOAD_URL_MIN_REMAINING are left.
+DOWNLOAD_URL_EXPIRY = 300
+DOWNLOAD_URL_MIN_REMAINING = 120
+MAX_DOWNLOAD_BATCH = 100
+
+# S3 ingestion. Rows for objects under UPLOAD_PREFIX get a deterministic id
+# derived from the object key, so the browser, the batch finalize call and
+# the ObjectCreated consumer all upsert the same row. The reconciler leaves
+# objects younger than RECONCILE_GRACE_HOURS alone (uploads in flight).
+UPLOAD_PREFIX = "uploads/"
+FILE_ID_NAMESPACE = uuid.UUID("6f1c0b7e-9d7a-4c55-9a0e-2f3b1c8d4e61")
+INGESTED_FILE_FIELDS = ("size", "content_type", "checksum", "ingested_at")
+INGEST_WORKERS = 8
+RECONCILE_GRACE_HOURS = float(os.environ.get("RECONCILE_GRACE_HOURS", "24"))
+
+# Batch uploads: files per presign call. File ids are reserved up front and
+# the rows are written by a single finalize call.
+MAX_UPLOAD_BATCH = 50
+
+# Audit log. Events go to TABLE_AUDIT (pk "entity" = "<resource>#<id>", sk
+# "ts"; "day" plus a day-ts-index GSI for time-range reads; TTL attribute
+# "expires_at"). AUDIT_MODE "buffer" collects events during a request and
+# writes them in one batch after the response is built; "stream" records
+# nothing inline and relies on audit_stream_handler consuming the tables'
+# DynamoDB Streams; "off" disables auditing.
+AUDIT_MODE = os.environ.get("AUDIT_MODE", "buffer")
+AUDIT_RETENTION_DAYS = int(os.environ.get("AUDIT_RETENTION_DAYS", "365"))
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+
+# Dashboard counters. One item (id DASHBOARD_COUNTERS_ID) in TABLE_COUNTERS
+# holds every header number as a flat attribute, "<resource>#total",
+# "<resource>#unread", "<resource>#day#<YYYY-MM-DD>" and
+# "<resource>#<group_by field>#<value>", kept current with atomic ADDs on the
+# write paths. Writes the request path cannot attribute (bulk updates, batch
+# hard deletes, edits to a counted field) are corrected by recount_dashboard(),
+# which also drops day buckets older than DASHBOARD_KEEP_DAYS.
+DASHBOARD_COUNTERS = {r: schema.get("counters", {}) for r, schema in RESOURCE_SCHEMAS.items()}
+DASHBOARD_COUNTERS_ID = "dashboard"
+DASHBOARD_WINDOW_DAYS = 7
+DASHBOARD_KEEP_DAYS = int(os.environ.get("DASHBOARD_KEEP_DAYS", "35"))
+DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Calendar. Bookable resources store the submitted start as local ISO 8601
+# (naive input is read at CALENDAR_UTC_OFFSET) plus derived "starts_at" and
+# "ends_at" (UTC, SLOT_FORMAT, so they sort as strings), "day" and the local
+# "month" bucket. The month-starts_at-index GSI keeps each month's slots in
+# start order: a range read touches one partition per month and an overlap
+# check is a bounded key-range seek, never a scan. Slots are at most
+# CALENDAR_MAX_MINUTES long, which bounds how far back an overlap can start.
+CALENDAR_SPECS = {r: schema["calendar"] for r, schema in RESOURCE_SCHEMAS.items() if schema.get("calendar")}
+CALENDAR_TZ = datetime.strptime(os.environ.get("CALENDAR_UTC_OFFSET", "+05:30"), "%z").tzinfo
+CALENDAR_DEFAULT_MINUTES = int(os.environ.get("CALENDAR_DEFAULT_MINUTES", "30"))
+CALENDAR_MAX_MINUTES = 8 * 60
+CALENDAR_MAX_RANGE_DAYS = 366
+CALENDAR_INDEX = "month-starts_at-index"
+SLOT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Tombstones older than this are removed by compact_tombstones().
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get("TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Warm-container read cache. Invalidation is local to one container, so TTLs
+# bound how stale another container's copy can get.
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "30"))
+CACHE_TTLS = {
+    "services": float(os.environ.get("SERVICES_CACHE_TTL_SECONDS", "300")),
+    "files": float(os.environ.get("FILES_CACHE_TTL_SECONDS", "120")),
+}
+# Resources whose list responses are cached as well as single items.
+CACHED_LIST_RESOURCES = {"services"}
+
+# HTTP caching. Public catalogue data may sit in CloudFront; everything else
+# is admin data that browsers must revalidate (ETag) and CDNs must not keep.
+CACHE_CONTROL = {
+    "services": "public, max-age=60, s-maxage=300, stale-while-revalidate=60",
+}
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+# -------------------------
+# AWS clients
+# -------------------------
+# Built on first use and memoized at module scope, so a cold start only pays
+# for the clients a request actually touches and warm invocations reuse them.
+# Creation is locked: worker pools may make the first call from several
+# threads, and boto3's default session is not thread-safe while building.
+_AWS: Dict[str, Any] = {}
+_AWS_LOCK = threading.Lock()
+
+def _aws(key: str, build) -> Any:
+    client = _AWS.get(key)
+    if client is None:
+        with _AWS_LOCK:
+            client = _AWS.get(key)
+            if client is None:
+                import boto3
+
+                client = _AWS[key] = build(boto3)
+    return client
+
+def get_s3():
+    return _aws("s3", lambda boto3: boto3.client("s3"))
+
+def get_dynamodb_client():
+    """Low-level client: cheaper to build than the resource layer."""
+    return _aws("dynamodb_client", lambda boto3: boto3.client("dynamodb"))
+
+def get_dynamodb():
+    return _aws("dynamodb", lambda boto3: boto3.resource("dynamodb"))
+
+def get_lambda():
+    return _aws("lambda", lambda boto3: boto3.client("lambda"))
+
+# -------------------------
+# Wire format (low-level client)
+# -------------------------
+# The resource layer turns every number into a Decimal that
+# EnhancedJSONEncoder then turns back into a float. For our item shapes
+# (strings, numbers, bools, lists, maps) these convert straight between
+# DynamoDB attribute values and JSON-ready Python values.
+def _wire_number(text: str) -> Any:
+    if "." in text or "e" in text or "E" in text:
+        return float(text)
+    return int(text)
+
+def from_wire(value: Dict[str, Any]) -> Any:
+    (tag, v), = value.items()
+    if tag == "S" or tag == "BOOL":
+        return v
+    if tag == "N":
+        return _wire_number(v)
+    if tag == "M":
+        return {k: from_wire(x) for k, x in v.items()}
+    if tag == "L":
+        return [from_wire(x) for x in v]
+    if tag == "NULL":
+        return None
+    if tag == "SS":
+        return list(v)
+    if tag == "NS":
+        return [_wire_number(x) for x in v]
+    if tag == "B":
+        return base64.b64encode(v).decode("ascii")
+    if tag == "BS":
+        return [base64.b64encode(x).decode("ascii") for x in v]
+    raise ValueError(f"unsupported attribute type {tag}")
+
+def to_wire(value: Any) -> Dict[str, Any]:
+    if isinstance(value, str):
+        return {"S": value}
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return {"N": str(value)}
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, dict):
+        return {"M": {k: to_wire(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {"L": [to_wire(v) for v in value]}
+    raise ValueError(f"cannot store {type(value).__name__} in DynamoDB")
+
+def item_from_wire(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: from_wire(v) for k, v in item.items()}
+
+def item_to_wire(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: to_wire(v) for k, v in item.items()}
+
+def from_resource(value: Any) -> Any:
+    """Resource-layer value (Decimal numbers, sets) as from_wire() returns it."""
+    if isinstance(value, decimal.Decimal):
+        return _wire_number(str(value))
+    if isinstance(value, dict):
+        return {k: from_resource(v) for k, v in value.items()}
+    if isinstance(value, (list, set)):
+        return [from_resource(v) for v in value]
+    return value
+
 # -------------------------
 # Helpers
 # -------------------------
@@ -51,21 +498,61 @@ class EnhancedJSONEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, decimal.Decimal):
             return float(obj)
+        if isinstance(obj, datetime):
+            return obj.isoformat()
         return super().default(obj)
 
+def _orjson_default(obj: Any) -> Any:
+    # orjson handles datetime itself; Decimal is all it needs help with.
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Response encoder: orjson when it is packaged with the function (and not
+# disabled via JSON_BACKEND=stdlib), otherwise one reusable stdlib encoder.
+_STDLIB_ENCODER = EnhancedJSONEncoder(separators=(",", ":"))
+try:
+    if os.environ.get("JSON_BACKEND", "auto") == "stdlib":
+        raise ImportError
+    import orjson
+
+    def _encode_json(body: Any) -> str:
+        return orjson.dumps(body, default=_orjson_default).decode("utf-8")
+
+    JSON_BACKEND = "orjson"
+except ImportError:
+    _encode_json = _STDLIB_ENCODER.encode
+    JSON_BACKEND = "stdlib"
+
+def encode_body(body: Any) -> str:
+    return _encode_json(body) if body is not None else ""
+
+# Response compression. Small bodies are not worth the CPU or base64 growth.
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1400"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Headers shared by every response; make_response() copies rather than
+# rebuilding them.
+BASE_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET,POST,PUT,PATCH,DELETE,OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization,If-None-Match,If-Match,Prefer",
+    "Access-Control-Expose-Headers": "ETag",
+}
+
 def make_response(
     status: int,
     body: Any = None,
     extra_headers: Optional[Dict[str, str]] = None,
+    encoded_body: Optional[str] = None,
 ) -> Dict[str, Any]:
-    headers = {
-        "Content-Type": "application/json",
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "GET,POST,PUT,PATCH,DELETE,OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type,Authorization",
-    }
-    if extra_headers:
-        headers.update(extra_headers)
+    headers = {**BASE_HEADERS, **extra_headers} if extra_headers else BASE_HEADERS.copy()
     # return {
     #     "statusCode": status,
     #     "headers": headers,
@@ -74,8 +561,99 @@ def make_response(
     return {
         "statusCode": status,
         "headers": headers,
-        "body": json.dumps(body, cls=EnhancedJSONEncoder) if body is not None else "",
+        "body": encoded_body if encoded_body is not None else encode_body(body),
+    }
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    # REST APIs keep the client's header casing, HTTP APIs lowercase it.
+    name = name.lower()
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def _accepted_encodings(event: Dict[str, Any]) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for token in (get_header(event, "Accept-Encoding") or "").split(","):
+        name, _, params = token.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    return accepted
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Strong ETag of the `encoding`-compressed form of a representation."""
+    return etag[:-1] + f'-{encoding}"' if etag.endswith('"') else etag
+
+def compress_response(event: Dict[str, Any], resp: Dict[str, Any]) -> Dict[str, Any]:
+    """Negotiate br/gzip for large bodies; API Gateway needs them base64."""
+    body = resp.get("body") or ""
+    if len(body) < COMPRESS_MIN_BYTES or resp.get("isBase64Encoded"):
+        return resp
+    # Shared caches must key on the encoding even when this reply is identity.
+    resp["headers"]["Vary"] = "Accept-Encoding"
+    accepted = _accepted_encodings(event)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        encoding, data = "br", brotli.compress(body.encode("utf-8"), quality=BROTLI_QUALITY)
+    elif accepted.get("gzip", 0) > 0:
+        encoding, data = "gzip", gzip.compress(body.encode("utf-8"), compresslevel=GZIP_LEVEL)
+    else:
+        return resp
+    resp["headers"]["Content-Encoding"] = encoding
+    if resp["headers"].get("ETag"):
+        resp["headers"]["ETag"] = encoded_etag(resp["headers"]["ETag"], encoding)
+    resp["body"] = base64.b64encode(data).decode("ascii")
+    resp["isBase64Encoded"] = True
+    return resp
+
+def make_conditional_response(
+    event: Dict[str, Any], resource: str, body: Any, etag: Optional[str] = None
+) -> Dict[str, Any]:
+    """200 with an ETag and the resource's Cache-Control, or 304 if the
+    client's If-None-Match already names this representation.
+
+    The ETag defaults to a hash of the body; single items pass item_etag().
+    """
+    encoded = encode_body(body)
+    etag = etag or '"' + hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32] + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL.get(resource, DEFAULT_CACHE_CONTROL),
     }
+    if_none_match = get_header(event, "If-None-Match") or ""
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    # The client may hold any encoding of this representation; a 304
+    # confirms the one it named.
+    variants = {etag} | {encoded_etag(etag, e) for e in ("gzip", "br")}
+    matched = candidates & variants
+    if matched or "*" in candidates:
+        if matched:
+            headers["ETag"] = matched.pop()
+        if len(encoded) >= COMPRESS_MIN_BYTES:
+            headers["Vary"] = "Accept-Encoding"
+        return make_response(304, None, headers)
+    return make_response(200, None, headers, encoded_body=encoded)
+
+def item_etag(item: Dict[str, Any]) -> str:
+    """Version-based ETag of a single item; every write bumps "version"."""
+    return f'"v{int(item.get("version") or 0)}"'
+
+def parse_if_match(event: Dict[str, Any]) -> Optional[int]:
+    """Expected item version from If-Match: None if absent or "*"."""
+    raw = (get_header(event, "If-Match") or "").strip()
+    if not raw or raw == "*":
+        return None
+    tag = raw.split(",")[0].strip().removeprefix("W/").strip('"')
+    # Compressed responses carry "v<n>-gzip"/"v<n>-br" for the same version.
+    tag = tag.split("-", 1)[0]
+    if not tag.startswith("v") or not tag[1:].isdigit():
+        raise ValueError("If-Match must be an ETag from this API")
+    return int(tag[1:])
 
 def parse_json_body(event: Dict[str, Any]) -> Dict[str, Any]:
     body = event.get("body") or "{}"
@@ -94,20 +672,296 @@ def parse_json_body(event: Dict[str, Any]) -> Dict[str, Any]:
 def choose_table(resource: str):
     tbl = TABLE_MAP.get(resource)
     if tbl is None:
+        tbl = TABLE_MAP[resource] = get_dynamodb().Table(table_name(resource))
+    return tbl
+
+def table_name(resource: str) -> str:
+    schema = RESOURCE_SCHEMAS.get(resource)
+    if schema is None:
         raise ValueError(
-            f"unknown resource '{resource}'. Allowed: {list(TABLE_MAP.keys())}"
+            f"unknown resource '{resource}'. Allowed: {list(RESOURCE_SCHEMAS.keys())}"
         )
-    return tbl
+    return schema["table"]
 
-def get_file_by_id(file_id: str) -> Optional[Dict[str, Any]]:
+def choose_index(
+    resource: str, filters: Dict[str, str]
+) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """Pick the first declared index whose partition key is filtered on.
+
+    Falls back to the resource-wide index when no filter matches. Returns
+    (None, None) if the resource declares no usable index.
+    """
+    indexes = RESOURCE_INDEXES.get(resource, [])
+    for index in indexes:
+        if index["pk"] != "resource" and filters.get(index["pk"]):
+            return index, filters[index["pk"]]
+    for index in indexes:
+        if index["pk"] == "resource":
+            return index, resource
+    return None, None
+
+def parse_fields(resource: str, raw: Optional[str]) -> Optional[List[str]]:
+    """Resolve the ?fields= parameter into a projection list (None = all)."""
+    if raw is None:
+        return LIST_PROJECTIONS.get(resource)
+    if raw in ("", "all"):
+        return None
+    if raw == "summary":
+        return LIST_PROJECTIONS.get(resource)
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    if len(fields) > MAX_PROJECTION_FIELDS or not all(FIELD_NAME_RE.match(f) for f in fields):
+        raise ValueError("invalid fields parameter")
+    return fields
+
+def _join_names(names: List[str]) -> str:
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+def compile_schema(resource: str, schema: Dict[str, Any]):
+    """Build a single-pass normalizer for one resource schema.
+
+    The returned function takes a raw payload and returns the normalized
+    fields (schema fields coerced and defaulted, extras passed through), or
+    raises ValueError describing the first problem found.
+    """
+    specs = {
+        name: (spec["type"], spec.get("default", [] if spec["type"] == "list" else ""),
+               spec.get("max_length"))
+        for name, spec in schema.get("fields", {}).items()
+    }
+    required = [name for name, spec in schema.get("fields", {}).items() if spec.get("required")]
+    required_error = f"{_join_names(required)} required for {resource}" if required else ""
+
+    def normalize(payload: Dict[str, Any]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        size = 0
+        for key, value in payload.items():
+            spec = specs.get(key)
+            if spec is None:
+                if key not in RESERVED_FIELDS:
+                    out[key] = value
+                    size += len(key) + (len(value) if isinstance(value, str) else len(encode_body(value)))
+                continue
+            kind, default, max_length = spec
+            if value is None:
+                continue
+            if kind == "str":
+                if not isinstance(value, str):
+                    raise ValueError(f"{key} must be a string")
+                value = value.strip()
+                if max_length and len(value) > max_length:
+                    raise ValueError(f"{key} exceeds {max_length} characters")
+                size += len(key) + len(value)
+            elif kind == "bool":
+                value = bool(value)
+            elif kind == "list":
+                if not isinstance(value, list):
+                    raise ValueError(f"{key} must be a list")
+                if max_length and len(value) > max_length:
+                    raise ValueError(f"{key} exceeds {max_length} entries")
+                size += len(key) + len(encode_body(value))
+            out[key] = value
+        if size > MAX_ITEM_BYTES:
+            raise ValueError(f"item exceeds {MAX_ITEM_BYTES} bytes")
+        for name, (kind, default, _) in specs.items():
+            if name not in out:
+                out[name] = list(default) if kind == "list" else default
+        if any(not out.get(name) for name in required):
+            raise ValueError(required_error)
+        return out
+
+    return normalize
+
+NORMALIZERS = {
+    resource: compile_schema(resource, schema) for resource, schema in RESOURCE_SCHEMAS.items()
+}
+
+def _b64e(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def _b64d(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _cursor_key() -> bytes:
+    if _CURSOR_KEY is None:
+        raise RuntimeError("CURSOR_SECRET is not configured; paging is unavailable")
+    return _CURSOR_KEY
+
+def encode_cursor(
+    last_key: Dict[str, Any], index_name: Optional[str], limit: int, descending: bool
+) -> str:
+    """Pack a LastEvaluatedKey into an opaque, signed `last` token.
+
+    Layout: base64url(json payload) "." base64url(truncated HMAC-SHA256).
+    """
+    payload = {
+        "v": CURSOR_VERSION,
+        "i": index_name or "",
+        "d": 1 if descending else 0,
+        "n": limit,
+        "k": last_key,
+    }
+    raw = json.dumps(payload, cls=EnhancedJSONEncoder, separators=(",", ":")).encode("utf-8")
+    sig = hmac.new(_cursor_key(), raw, hashlib.sha256).digest()[:12]
+    return f"{_b64e(raw)}.{_b64e(sig)}"
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Verify and unpack a token from encode_cursor(); raises ValueError."""
+    key = _cursor_key()
     try:
-        table = dynamodb.Table("judicial-files")
-        res = table.get_item(Key={"id": file_id})
-        return res.get("Item")
+        body, sig = token.split(".", 1)
+        raw = _b64d(body)
+        expected = hmac.new(key, raw, hashlib.sha256).digest()[:12]
+        if not hmac.compare_digest(expected, _b64d(sig)):
+            raise ValueError("bad signature")
+        payload = json.loads(raw, parse_float=decimal.Decimal)
     except Exception:
-        logger.exception("Error fetching file by id")
+        raise ValueError("invalid_cursor")
+    if payload.get("v") != CURSOR_VERSION or not isinstance(payload.get("k"), dict):
+        raise ValueError("invalid_cursor")
+    return payload
+
+def estimate_total(resource: str) -> int:
+    # ItemCount is refreshed by DynamoDB roughly every six hours; the Table
+    # object caches it for the life of the container.
+    return int(choose_table(resource).item_count)
+
+def create_upload_batch(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Presign uploads for many files at once and reserve their file ids.
+
+    Files at or above MULTIPART_THRESHOLD get a multipart upload instead of a
+    single PUT URL. The reservation is finalized by finalize_upload_batch().
+    """
+    s3 = get_s3()
+    batch_id = uuid.uuid4().hex
+    reserved: List[Dict[str, Any]] = []
+    out: List[Dict[str, Any]] = []
+    try:
+        for entry in entries:
+            filename = entry["filename"].strip()
+            content_type = entry.get("content_type") or "application/octet-stream"
+            key = f"uploads/{uuid.uuid4().hex}_{filename}"
+            file_id = file_id_for_key(key)
+            view: Dict[str, Any] = {"file_id": file_id, "filename": filename, "key": key, "file_url": FILES_URL_PREFIX + key}
+            size = entry.get("size")
+            if size is not None and size >= MULTIPART_THRESHOLD:
+                view["multipart"] = begin_multipart_upload(key, filename, content_type, size)
+            else:
+                view["upload_url"] = s3.generate_presigned_url(
+                    "put_object", Params={"Bucket": FILES_BUCKET, "Key": key}, ExpiresIn=900
+                )
+            reserved.append({"file_id": file_id, "key": key, "filename": filename, "content_type": content_type})
+            out.append(view)
+    except ClientError as e:
+        logger.exception("Error presigning upload batch")
+        return make_response(500, {"error": "presign_failed", "message": str(e)})
+
+    uploads_table().put_item(
+        Item={
+            "id": batch_id,
+            "kind": "batch",
+            "files": reserved,
+            "status": "in_progress",
+            "created_at": now_iso(),
+            "expires_at": int(time.time()) + UPLOAD_STATE_DAYS * 86400,
+        }
+    )
+    logger.info("Reserved upload batch %s with %d files", batch_id, len(reserved))
+    return make_response(200, {"batch_id": batch_id, "files": out})
+
+def finalize_upload_batch(batch_id: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Write the files rows of a reserved batch with BatchWriteItem.
+
+    `files` holds {file_id, ...metadata} for the uploads the client finished;
+    objects that never reached S3 are reported rather than written. May be
+    called again for files that failed the first time.
+    """
+    state = get_upload_state(batch_id)
+    if not state or state.get("kind") != "batch":
+        return make_response(404, {"error": "upload_batch_not_found"})
+    reserved = {f["file_id"]: f for f in state["files"]}
+    done = set(state.get("finalized") or ())
+
+    results: List[Dict[str, Any]] = []
+    pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    for entry in files:
+        file_id = str(entry.get("file_id", ""))
+        slot = reserved.get(file_id)
+        if slot is None:
+            results.append({"op": "create", "id": file_id, "status": "failed", "error": "not_reserved"})
+        elif file_id in done:
+            results.append({"op": "create", "id": file_id, "status": "ok", "note": "already_finalized"})
+        else:
+            pending.append((slot, entry))
+
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+        heads = list(pool.map(object_metadata, [slot["key"] for slot, _ in pending]))
+
+    payloads: List[Dict[str, Any]] = []
+    ids: List[str] = []
+    for (slot, entry), obj in zip(pending, heads):
+        if obj is None:
+            results.append({"op": "create", "id": slot["file_id"], "status": "failed", "error": "not_uploaded"})
+            continue
+        payload = {k: v for k, v in entry.items() if k != "file_id"}
+        payload.setdefault("title", slot["filename"])
+        payload.setdefault("type", "file")
+        payload.update(obj, file_url=FILES_URL_PREFIX + slot["key"], s3_key=slot["key"])
+        payloads.append(payload)
+        ids.append(slot["file_id"])
+
+    if payloads:
+        written = batch_write_items("files", payloads, [], create_ids=ids)
+        results.extend(written)
+        ok_ids = {r["id"] for r in written if r["status"] == "ok"}
+        if ok_ids:
+            uploads_table().update_item(
+                Key={"id": batch_id},
+                UpdateExpression="ADD finalized :ids SET #s = :s",
+                ExpressionAttributeNames={"#s": "status"},
+                ExpressionAttributeValues={
+                    ":ids": ok_ids,
+                    ":s": "completed" if len(done | ok_ids) == len(reserved) else "in_progress",
+                },
+            )
+    order = {str(entry.get("file_id", "")): pos for pos, entry in enumerate(files)}
+    results.sort(key=lambda r: order.get(r.get("id", ""), len(order)))
+    return make_response(200, {"batch_id": batch_id, "results": results})
+
+def file_id_for_key(key: str) -> str:
+    return str(uuid.uuid5(FILE_ID_NAMESPACE, key))
+
+def object_metadata(key: str) -> Optional[Dict[str, Any]]:
+    """Size, content type and checksum of an object in FILES_BUCKET, or None.
+
+    The checksum is the object's SHA-256 when the uploader supplied one,
+    otherwise its ETag (an MD5 for single-part uploads).
+    """
+    try:
+        head = get_s3().head_object(Bucket=FILES_BUCKET, Key=key, ChecksumMode="ENABLED")
+    except ClientError:
         return None
+    checksum = head.get("ChecksumSHA256")
+    return {
+        "size": head["ContentLength"],
+        "content_type": head.get("ContentType") or "application/octet-stream",
+        "checksum": f"sha256:{checksum}" if checksum else f"etag:{head.get('ETag', '').strip(chr(34))}",
+    }
+
+def s3_key_for(item: Dict[str, Any]) -> Optional[str]:
+    """The FILES_BUCKET key of a file item (older items only have file_url)."""
+    if item.get("s3_key"):
+        return item["s3_key"]
+    file_url = item.get("file_url") or ""
+    if file_url.startswith(FILES_URL_PREFIX):
+        return file_url[len(FILES_URL_PREFIX):]
+    return None
 
+def get_file_by_id(file_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        return get_resource_item("files", file_id)
+    except ClientError:
+        logger.exception("Error fetching file by id")
+        return None
 
 def create_presigned_upload(event: Dict[str, Any]) -> Dict[str, Any]:
     data = parse_json_body(event)
@@ -117,10 +971,17 @@ def create_presigned_upload(event: Dict[str, Any]) -> Dict[str, Any]:
     if not filename:
         return make_response(400, {"error": "filename_required"})
 
+    size = data.get("size")
+    if size is not None:
+        if isinstance(size, bool) or not isinstance(size, int) or not 0 < size <= MAX_UPLOAD_BYTES:
+            return make_response(400, {"error": f"size must be an integer between 1 and {MAX_UPLOAD_BYTES}"})
+        if size >= MULTIPART_THRESHOLD:
+            return start_multipart_upload(filename, content_type, size)
+
     key = f"uploads/{uuid.uuid4().hex}_{filename}"
 
     try:
-        url = s3.generate_presigned_url(
+        url = get_s3().generate_presigned_url(
             "put_object",
             Params={
                 "Bucket": FILES_BUCKET,
@@ -133,256 +994,1786 @@ def create_presigned_upload(event: Dict[str, Any]) -> Dict[str, Any]:
         logger.exception("Error generating presigned URL")
         return make_response(500, {"error": "presign_failed", "message": str(e)})
 
-    file_url = f"https://{FILES_BUCKET}.s3.ap-south-1.amazonaws.com/{key}"
-    return make_response(200, {"upload_url": url, "key": key, "file_url": file_url})
-
-def create_presigned_download(event: Dict[str, Any]) -> Dict[str, Any]:
-    file_id = event.get("pathParameters", {}).get("id")
-    if not file_id:
-        return make_response(400, {"error": "file_id_required"})
-
-    item = get_file_by_id(file_id)
-    if not item or not item.get("file_url"):
-        return make_response(404, {"error": "file_not_found"})
+    file_url = FILES_URL_PREFIX + key
+    return make_response(
+        200, {"upload_url": url, "key": key, "file_url": file_url, "file_id": file_id_for_key(key)}
+    )
 
-    try:
-        file_url = item["file_url"]
+def choose_part_size(size: int) -> int:
+    """Smallest whole-MiB part size >= MIN_PART_BYTES that fits in MAX_PARTS."""
+    mib = 1024 * 1024
+    needed = -(-size // MAX_PARTS)
+    return max(MIN_PART_BYTES, -(-needed // mib) * mib)
 
-        # 🔥 FIX A — derive key from file_url
-        prefix = f"https://{FILES_BUCKET}.s3.ap-south-1.amazonaws.com/"
-        if not file_url.startswith(prefix):
-            return make_response(400, {"error": "invalid_file_url"})
+def uploads_table():
+    tbl = TABLE_MAP.get("_uploads")
+    if tbl is None:
+        tbl = TABLE_MAP["_uploads"] = get_dynamodb().Table(TABLE_UPLOADS)
+    return tbl
 
-        key = file_url.replace(prefix, "", 1)
+def _part_urls(state: Dict[str, Any], part_numbers: List[int]) -> List[Dict[str, Any]]:
+    s3 = get_s3()
+    return [
+        {
+            "part_number": n,
+            "url": s3.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": FILES_BUCKET,
+                    "Key": state["key"],
+                    "UploadId": state["s3_upload_id"],
+                    "PartNumber": n,
+                },
+                ExpiresIn=PART_URL_EXPIRY,
+            ),
+        }
+        for n in part_numbers
+    ]
 
-        url = s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": FILES_BUCKET,
-                "Key": key,
-            },
-            ExpiresIn=300,  # 5 minutes
-        )
+def _uploaded_parts(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    parts: List[Dict[str, Any]] = []
+    kwargs = {"Bucket": FILES_BUCKET, "Key": state["key"], "UploadId": state["s3_upload_id"]}
+    while True:
+        resp = get_s3().list_parts(**kwargs)
+        parts.extend({"part_number": p["PartNumber"], "etag": p["ETag"], "size": p["Size"]} for p in resp.get("Parts", []))
+        if not resp.get("IsTruncated"):
+            return parts
+        kwargs["PartNumberMarker"] = resp["NextPartNumberMarker"]
 
-        return make_response(200, {"download_url": url})
+def _upload_view(state: Dict[str, Any], uploaded: List[Dict[str, Any]]) -> Dict[str, Any]:
+    done = {p["part_number"] for p in uploaded}
+    missing = [n for n in range(1, int(state["part_count"]) + 1) if n not in done]
+    return {
+        "upload_id": state["id"],
+        "key": state["key"],
+        "file_url": FILES_URL_PREFIX + state["key"],
+        "size": int(state["size"]),
+        "part_size": int(state["part_size"]),
+        "part_count": int(state["part_count"]),
+        "status": state["status"],
+        "uploaded_parts": sorted(done),
+        "parts": _part_urls(state, missing[:PART_URL_BATCH]),
+        "remaining": len(missing),
+        "expires_in": PART_URL_EXPIRY,
+    }
 
+def start_multipart_upload(filename: str, content_type: str, size: int) -> Dict[str, Any]:
+    try:
+        view = begin_multipart_upload(f"uploads/{uuid.uuid4().hex}_{filename}", filename, content_type, size)
     except ClientError as e:
-        logger.exception("Error generating download URL")
-        return make_response(500, {"error": "download_failed"})
-
+        logger.exception("Error starting multipart upload")
+        return make_response(500, {"error": "presign_failed", "message": str(e)})
+    return make_response(200, view)
 
-# -------------------------
-# CRUD operations
-# -------------------------
-def create_resource_item(resource: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    table = choose_table(resource)
-    item_id = str(uuid.uuid4())
-    base: Dict[str, Any] = {
-        "id": item_id,
-        "form_id": payload.get("form_id", resource),
+def begin_multipart_upload(key: str, filename: str, content_type: str, size: int) -> Dict[str, Any]:
+    """Create the S3 upload and its TABLE_UPLOADS record; returns the client view."""
+    part_size = choose_part_size(size)
+    s3_upload_id = get_s3().create_multipart_upload(
+        Bucket=FILES_BUCKET, Key=key, ContentType=content_type
+    )["UploadId"]
+    state = {
+        "id": uuid.uuid4().hex,
+        "key": key,
+        "s3_upload_id": s3_upload_id,
+        "filename": filename,
+        "content_type": content_type,
+        "size": size,
+        "part_size": part_size,
+        "part_count": -(-size // part_size),
+        "status": "in_progress",
         "created_at": now_iso(),
-        "read": False,
+        "expires_at": int(time.time()) + UPLOAD_STATE_DAYS * 86400,
     }
+    uploads_table().put_item(Item=state)
+    logger.info("Started multipart upload %s: %s (%d parts)", state["id"], key, state["part_count"])
+    return _upload_view(state, [])
 
-    # On UPDATE / STATUS CHANGE
-    base["audit"] = {
-    "action_type": "CREATE",
-    "updated_by": payload.get("updated_by", "system"),
-    "updated_at": now_iso(),
-    }
+def get_upload_state(upload_id: str) -> Optional[Dict[str, Any]]:
+    return uploads_table().get_item(Key={"id": upload_id}).get("Item")
 
-    # Resource-specific defaults
-    if resource == "forms":
-        base.update(
-            {
-                "name": payload.get("name", "").strip(),
-                "email": payload.get("email", "").strip(),
-                "phone": payload.get("phone", "").strip(),
-                "message": payload.get("message", "").strip(),
-                "case_type": payload.get("case_type", "").strip(),
-            }
-        )
-    elif resource == "cases":
-        base.update(
-            {
-                "case_number": payload.get("case_number", "").strip(),
-                "title": payload.get("title", "").strip(),
-                "description": payload.get("description", "").strip(),
-                "court": payload.get("court", "").strip(),
-                "judgment_date": payload.get("judgment_date", "").strip(),
-            }
+def resume_multipart_upload(upload_id: str) -> Dict[str, Any]:
+    state = get_upload_state(upload_id)
+    if not state or state.get("kind"):
+        return make_response(404, {"error": "upload_not_found"})
+    if state["status"] != "in_progress":
+        return make_response(409, {"error": f"upload_{state['status']}"})
+    return make_response(200, _upload_view(state, _uploaded_parts(state)))
+
+def complete_multipart_upload(upload_id: str, parts: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Finish an upload. Parts default to what S3 has received, so browsers
+    need not read ETag headers from the part PUT responses."""
+    state = get_upload_state(upload_id)
+    if not state or state.get("kind"):
+        return make_response(404, {"error": "upload_not_found"})
+    if state["status"] != "in_progress":
+        return make_response(409, {"error": f"upload_{state['status']}"})
+    if parts:
+        listed = [{"part_number": int(p["part_number"]), "etag": str(p["etag"])} for p in parts]
+    else:
+        listed = _uploaded_parts(state)
+    numbers = sorted(p["part_number"] for p in listed)
+    if numbers != list(range(1, int(state["part_count"]) + 1)):
+        return make_response(
+            409,
+            {"error": "parts_missing", "uploaded": len(numbers), "part_count": int(state["part_count"])},
         )
-    elif resource == "messages":
-        base.update(
-            {
-                "sender": payload.get("sender", "").strip(),
-                "recipient": payload.get("recipient", "").strip(),
-                "body": payload.get("body", "").strip(),
-            }
+    try:
+        get_s3().complete_multipart_upload(
+            Bucket=FILES_BUCKET,
+            Key=state["key"],
+            UploadId=state["s3_upload_id"],
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": p["part_number"], "ETag": p["etag"]}
+                    for p in sorted(listed, key=lambda p: p["part_number"])
+                ]
+            },
         )
-    elif resource == "appointments":
-        base.update(
-            {
-                "client": payload.get("client", "").strip(),
-                "case_type": payload.get("case_type", "").strip(),
-                "datetime": payload.get("datetime", "").strip(),
-                "mode": payload.get("mode", "").strip(),
-                "status": payload.get("status", "").strip(),
-                "notes": payload.get("notes", "").strip(),
-            }
+    except ClientError as e:
+        logger.exception("Error completing multipart upload %s", upload_id)
+        return make_response(400, {"error": "complete_failed", "message": str(e)})
+    uploads_table().update_item(
+        Key={"id": upload_id},
+        UpdateExpression="SET #s = :s, completed_at = :t",
+        ExpressionAttributeNames={"#s": "status"},
+        ExpressionAttributeValues={":s": "completed", ":t": now_iso()},
+    )
+    file_url = FILES_URL_PREFIX + state["key"]
+    return make_response(200, {"upload_id": upload_id, "key": state["key"], "file_url": file_url})
+
+def abort_multipart_upload(upload_id: str) -> Dict[str, Any]:
+    state = get_upload_state(upload_id)
+    if not state or state.get("kind"):
+        return make_response(404, {"error": "upload_not_found"})
+    if state["status"] == "in_progress":
+        get_s3().abort_multipart_upload(
+            Bucket=FILES_BUCKET, Key=state["key"], UploadId=state["s3_upload_id"]
         )
-    elif resource == "services":
-        base.update(
-            {
-                "name": payload.get("name", "").strip(),
-                "category": payload.get("category", "").strip(),
-                "description": payload.get("description", "").strip(),
-                "shown": bool(payload.get("shown", True)),
-            }
+        uploads_table().update_item(
+            Key={"id": upload_id},
+            UpdateExpression="SET #s = :s",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":s": "aborted"},
         )
-    elif resource == "files":   # 👈 NEW
-        base.update(
-            {
-                "title": payload.get("title", "").strip(),
-                "type": payload.get("type", "").strip(),         # template/file/etc
-                "file_url": payload.get("file_url", "").strip(), # S3 or any URL
-                "description": payload.get("description", "").strip(),
-                "category": payload.get("category", "").strip(),
-                "status": payload.get("status", "active").strip(),
-                "tags": payload.get("tags", []),
-            }
+    return make_response(204, None)
+
+def presigned_download_url(file_id: str, key: str) -> Dict[str, Any]:
+    """A GET URL for `key`, reused from the warm cache while it is fresh enough."""
+    cache_key = ("url", "files", file_id)
+    cached = READ_CACHE.get(cache_key)
+    if cached is None or cached["key"] != key:
+        url = get_s3().generate_presigned_url(
+            "get_object",
+            Params={"Bucket": FILES_BUCKET, "Key": key},
+            ExpiresIn=DOWNLOAD_URL_EXPIRY,
         )
+        cached = {"key": key, "url": url, "expires_at": time.time() + DOWNLOAD_URL_EXPIRY}
+        READ_CACHE.set(cache_key, cached, DOWNLOAD_URL_EXPIRY - DOWNLOAD_URL_MIN_REMAINING)
+    return {"download_url": cached["url"], "expires_in": int(cached["expires_at"] - time.time())}
 
-    # Include any extra fields from payload (non-destructive)
-    extras = {k: v for k, v in payload.items() if k not in base}
-    base.update(extras)
+def create_presigned_download(file_id: str) -> Dict[str, Any]:
+    if not file_id:
+        return make_response(400, {"error": "file_id_required"})
 
-    logger.info("Creating %s item in table %s: id=%s", resource, table.table_name, item_id)
-    table.put_item(Item=base)
-    return base
+    item = get_file_by_id(file_id)
+    if not item or not item.get("file_url"):
+        return make_response(404, {"error": "file_not_found"})
 
-def list_resource_items(
-    resource: str, limit: int = 50, last: Optional[str] = None
-) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
-    table = choose_table(resource)
-    kwargs: Dict[str, Any] = {"Limit": limit}
-    if last:
-        try:
-            kwargs["ExclusiveStartKey"] = json.loads(last)
-        except Exception:
-            logger.warning("invalid last key provided, ignoring")
-    resp = table.scan(**kwargs)
-    items = resp.get("Items", [])
-    logger.info("Scanned %d items from %s (limit=%s)", len(items), table.table_name, limit)
-    return items, resp.get("LastEvaluatedKey")
+    key = s3_key_for(item)
+    if not key:
+        return make_response(400, {"error": "invalid_file_url"})
+    try:
+        return make_response(200, presigned_download_url(file_id, key))
+    except ClientError:
+        logger.exception("Error generating download URL")
+        return make_response(500, {"error": "download_failed"})
 
-def get_resource_item(resource: str, item_id: str) -> Optional[Dict[str, Any]]:
-    table = choose_table(resource)
-    resp = table.get_item(Key={"id": item_id})
-    item = resp.get("Item")
-    logger.info("Get item from %s id=%s found=%s", table.table_name, item_id, bool(item))
-    return item
+def create_presigned_downloads(file_ids: List[str]) -> Dict[str, Any]:
+    """Download URLs for many files; metadata misses are fetched in one batch."""
+    unique_ids = list(dict.fromkeys(file_ids))
+    items: Dict[str, Dict[str, Any]] = {}
+    misses = []
+    for file_id in unique_ids:
+        item = READ_CACHE.get(("item", "files", file_id))
+        if item is None:
+            misses.append(file_id)
+        else:
+            items[file_id] = item
+    if misses:
+        fetched, _, _ = batch_get_items("files", misses)
+        for item in fetched:
+            items[item["id"]] = item
+            READ_CACHE.set(("item", "files", item["id"]), item, cache_ttl("files"))
 
-def update_read_flag(resource: str, item_id: str, read_flag: bool) -> Optional[Dict[str, Any]]:
-    table = choose_table(resource)
-    resp = table.update_item(
-        Key={"id": item_id},
-        UpdateExpression="SET #r = :v, updated_at = :u",
-        ExpressionAttributeNames={"#r": "read"},
-        ExpressionAttributeValues={":v": read_flag, ":u": now_iso()},
-        ReturnValues="ALL_NEW",
-    )
-    logger.info("Updated read flag on %s id=%s to %s", table.table_name, item_id, read_flag)
-    return resp.get("Attributes")
+    urls: Dict[str, Any] = {}
+    missing: List[str] = []
+    invalid: List[str] = []
+    for file_id in unique_ids:
+        item = items.get(file_id)
+        if not item or item.get("is_deleted"):
+            missing.append(file_id)
+            continue
+        key = s3_key_for(item)
+        if not key:
+            invalid.append(file_id)
+            continue
+        urls[file_id] = presigned_download_url(file_id, key)
+    return make_response(200, {"urls": urls, "missing": missing, "invalid": invalid})
 
-def delete_resource_item(resource: str, item_id: str) -> bool:
-    table = choose_table(resource)
-    # existing = table.get_item(Key={"id": item_id}).get("Item")
-    # if not existing:
-    #     logger.info("Delete requested for %s id=%s but item not found", table.table_name, item_id)
-    #     return False
-    if resource == "forms":
-        table.update_item(
-            Key={"id": item_id},
-            UpdateExpression="""
-                SET is_deleted = :d,
-                    audit = :a
-            """,
-            ExpressionAttributeValues={
-                ":d": True,
-                ":a": {
-                    "action_type": "DELETE",
-                    "updated_by": "admin",
-                    "updated_at": now_iso(),
-                },
-            },
-        )
-        return True
-    table.delete_item(Key={"id": item_id})
-    logger.info("Deleted %s id=%s from table %s", resource, item_id, table.table_name)
-    return True
+# -------------------------
+# Warm-container cache
+# -------------------------
+class TTLCache:
+    """Size-bounded LRU cache with per-entry expiry.
 
-def partial_update_item(resource: str, item_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    table = choose_table(resource)
-    updates.pop("id", None)
+    Lives at module scope, so entries survive across warm invocations of the
+    same Lambda container.
+    """
 
-    # UPDATE / STATUS_CHANGE audit log
-    updates["audit"] = {
-    "action_type": "UPDATE",
-    "updated_by": updates.get("updated_by", "admin"),
-    "updated_at": now_iso(),
-    }
+    def __init__(self, max_entries: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.data: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-    if not updates:
-        return None
+    def get(self, key: Tuple) -> Any:
+        entry = self.data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.data[key]
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
 
-    expr_parts = []
-    expr_names: Dict[str, str] = {}
-    expr_values: Dict[str, Any] = {}
-    idx = 0
-    for k, v in updates.items():
-        idx += 1
-        name_key = f"#f{idx}"
-        val_key = f":v{idx}"
-        expr_parts.append(f"{name_key} = {val_key}")
-        expr_names[name_key] = k
-        expr_values[val_key] = v
+    def set(self, key: Tuple, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        self.data[key] = (expires, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_entries:
+            self.data.popitem(last=False)
+            self.evictions += 1
 
-    expr_parts.append("#u = :u")
-    expr_names["#u"] = "updated_at"
-    expr_values[":u"] = now_iso()
+    def invalidate_resource(self, resource: str, item_id: Optional[str] = None) -> None:
+        """Drop cached lists of `resource` and either one item or all of them."""
+        for key in [k for k in self.data if k[1] == resource]:
+            if key[0] == "list" or item_id is None or key[2] == item_id:
+                del self.data[key]
 
-    update_expr = "SET " + ", ".join(expr_parts)
-    resp = table.update_item(
-        Key={"id": item_id},
-        UpdateExpression=update_expr,
-        ExpressionAttributeNames=expr_names,
-        ExpressionAttributeValues=expr_values,
-        ReturnValues="ALL_NEW",
-    )
-    logger.info(
-        "Partially updated %s id=%s fields=%s",
-        table.table_name,
-        item_id,
-        list(updates.keys()),
-    )
-    return resp.get("Attributes")
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+READ_CACHE = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+def cache_ttl(resource: str) -> float:
+    return CACHE_TTLS.get(resource, CACHE_TTL_SECONDS)
 
 # -------------------------
-# Router
+# Search index
 # -------------------------
-def route(event: Dict[str, Any]) -> Dict[str, Any]:
-    request_context = event.get("requestContext") or {}
-    http_ctx = request_context.get("http") or {}
+def tokenize(text: str) -> List[str]:
+    return [
+        t for t in SEARCH_TOKEN_RE.findall(text.lower())
+        if t not in SEARCH_STOPWORDS and (len(t) > 1 or t.isdigit())
+    ]
 
-    method = event.get("httpMethod") or http_ctx.get("method", "")
-    path_params = event.get("pathParameters") or {}
+def document_terms(resource: str, item: Dict[str, Any]) -> Tuple[Dict[str, int], int]:
+    """Weighted term frequencies and length of one item's searchable text."""
+    terms: Dict[str, int] = {}
+    length = 0
+    for field, weight in SEARCH_FIELDS[resource].items():
+        value = item.get(field)
+        if isinstance(value, list):
+            value = " ".join(str(v) for v in value)
+        if not isinstance(value, str) or not value:
+            continue
+        for token in tokenize(value):
+            terms[token] = terms.get(token, 0) + weight
+            length += weight
+    return terms, length
 
-    raw_path = (
-        event.get("rawPath")
-        or event.get("path")
-        or http_ctx.get("path")
-        or "/"
+class SearchIndex:
+    """In-memory inverted index over one resource, ranked with BM25."""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.docs: Dict[str, Tuple[Dict[str, int], int]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+        self.vocab: Optional[List[str]] = None  # sorted, rebuilt lazily for prefixes
+        self.watermark = ""  # highest indexed_at applied
+        self.refreshed = 0.0
+        self.lock = threading.Lock()
+
+    def apply(self, doc_id: str, terms: Dict[str, int], length: int) -> None:
+        """Replace a document's terms; empty terms remove it."""
+        with self.lock:
+            old = self.docs.pop(doc_id, None)
+            if old is not None:
+                self.total_length -= old[1]
+                for term in old[0]:
+                    posting = self.postings.get(term)
+                    if posting is not None:
+                        posting.pop(doc_id, None)
+                        if not posting:
+                            del self.postings[term]
+                            self.vocab = None
+            if terms:
+                self.docs[doc_id] = (terms, length)
+                self.total_length += length
+                for term, tf in terms.items():
+                    posting = self.postings.get(term)
+                    if posting is None:
+                        posting = self.postings[term] = {}
+                        self.vocab = None
+                    posting[doc_id] = tf
+
+    def expand(self, prefix: str) -> List[str]:
+        if self.vocab is None:
+            self.vocab = sorted(self.postings)
+        start = bisect.bisect_left(self.vocab, prefix)
+        out = []
+        for term in self.vocab[start:start + SEARCH_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            out.append(term)
+        return out
+
+    def search(self, query: str, limit: int) -> Tuple[List[Tuple[str, float]], int]:
+        """Top `limit` (id, score) pairs and the number of matching documents.
+
+        The last query word also matches as a prefix, for type-ahead.
+        """
+        words = tokenize(query)
+        if not words:
+            return [], 0
+        with self.lock:
+            n = len(self.docs)
+            if not n:
+                return [], 0
+            avg_len = self.total_length / n
+            query_terms = set(words)
+            if not query[-1:].isspace():
+                query_terms.update(self.expand(words[-1]))
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = self.K1 * (1 - self.B + self.B * self.docs[doc_id][1] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        top = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+        return top, len(scores)
+
+SEARCH_INDEXES: Dict[str, SearchIndex] = {}
+
+def search_table():
+    tbl = TABLE_MAP.get("_search")
+    if tbl is None:
+        tbl = TABLE_MAP["_search"] = get_dynamodb().Table(TABLE_SEARCH)
+    return tbl
+
+def _load_search_records(resource: str, since: Optional[str]) -> Iterator[Dict[str, Any]]:
+    read_page = _wire_reader("query", TABLE_SEARCH)
+    kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": "#pk = :pk",
+        "ExpressionAttributeNames": {"#pk": "resource"},
+        "ExpressionAttributeValues": {":pk": resource},
+    }
+    if since is not None:
+        kwargs["IndexName"] = "resource-indexed_at-index"
+        kwargs["KeyConditionExpression"] += " AND #sk > :since"
+        kwargs["ExpressionAttributeNames"]["#sk"] = "indexed_at"
+        kwargs["ExpressionAttributeValues"][":since"] = since
+    while True:
+        resp = read_page(**kwargs)
+        yield from resp["Items"]
+        if not resp.get("LastEvaluatedKey"):
+            return
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+def get_search_index(resource: str) -> SearchIndex:
+    """The warm in-memory index for a resource, loaded or refreshed as needed."""
+    if resource not in SEARCH_FIELDS:
+        table_name(resource)
+        raise ValueError(f"search is not enabled for '{resource}'")
+    index = SEARCH_INDEXES.get(resource)
+    now = time.monotonic()
+    if index is not None and now - index.refreshed < SEARCH_REFRESH_SECONDS:
+        return index
+
+    since = None
+    if index is None:
+        index = SearchIndex()
+    elif index.watermark:
+        skewed = datetime.fromisoformat(index.watermark) - timedelta(seconds=SEARCH_CLOCK_SKEW)
+        since = skewed.isoformat()
+    applied = 0
+    for record in _load_search_records(resource, since):
+        terms = {} if record.get("deleted") else record.get("terms") or {}
+        index.apply(record["id"], terms, int(record.get("length", 0)))
+        index.watermark = max(index.watermark, record.get("indexed_at", ""))
+        applied += 1
+    index.refreshed = now
+    SEARCH_INDEXES[resource] = index
+    logger.info("Search index %s: applied %d records, %d docs", resource, applied, len(index.docs))
+    return index
+
+def index_documents(resource: str, items: List[Dict[str, Any]], deleted_ids: Iterable[str] = ()) -> None:
+    """Write forward-index records for created/updated items and tombstones for
+    deleted ids, and apply them to this container's index.
+
+    The search index is derived data: failures are logged rather than failing
+    the write that triggered them, and rebuild_search_index() repairs drift.
+    """
+    if resource not in SEARCH_FIELDS:
+        return
+    stamp = now_iso()
+    records = []
+    for item in items:
+        if item.get("is_deleted"):
+            records.append({"resource": resource, "id": item["id"], "deleted": True, "indexed_at": stamp})
+            continue
+        terms, length = document_terms(resource, item)
+        records.append(
+            {"resource": resource, "id": item["id"], "terms": terms, "length": length, "indexed_at": stamp}
+        )
+    for item_id in deleted_ids:
+        records.append({"resource": resource, "id": item_id, "deleted": True, "indexed_at": stamp})
+    if not records:
+        return
+    try:
+        with search_table().batch_writer(overwrite_by_pkeys=["resource", "id"]) as batch:
+            for record in records:
+                batch.put_item(Item=record)
+    except ClientError:
+        logger.exception("Search index write failed for %s (%d records)", resource, len(records))
+        return
+    index = SEARCH_INDEXES.get(resource)
+    if index is not None:
+        for record in records:
+            index.apply(record["id"], record.get("terms") or {}, record.get("length", 0))
+
+def search_resource(
+    resource: str, query: str, limit: int = SEARCH_DEFAULT_LIMIT, fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    index = get_search_index(resource)
+    started = time.perf_counter()
+    top, total = index.search(query, limit)
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+    items, _, _ = batch_get_items(resource, [doc_id for doc_id, _ in top]) if top else ([], [], [])
+    by_id = {item["id"]: item for item in items if not item.get("is_deleted")}
+    results = []
+    for doc_id, score in top:
+        item = by_id.get(doc_id)
+        if item is None:
+            continue
+        if fields:
+            item = {k: item[k] for k in fields if k in item}
+        results.append(dict(item, _score=round(score, 4)))
+    return {"items": results, "total": total, "took_ms": took_ms}
+
+def rebuild_search_index(resource: str) -> Dict[str, Any]:
+    """Re-index every live item of a resource (backfill or drift repair)."""
+    if resource not in SEARCH_FIELDS:
+        raise ValueError(f"search is not enabled for '{resource}'")
+    chunk: List[Dict[str, Any]] = []
+    count = 0
+    for item in iter_parallel_scan(resource):
+        chunk.append(item)
+        if len(chunk) >= 500:
+            index_documents(resource, chunk)
+            count += len(chunk)
+            chunk = []
+    index_documents(resource, chunk)
+    count += len(chunk)
+    logger.info("Rebuilt search index for %s: %d documents", resource, count)
+    return {"resource": resource, "indexed": count}
+
+# -------------------------
+# Audit log
+# -------------------------
+AUDIT_BUFFER: List[Dict[str, Any]] = []
+
+def audit_event(
+    resource: str,
+    item_id: str,
+    action: str,
+    actor: str,
+    changes: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    at = now_iso()
+    event = {
+        "entity": f"{resource}#{item_id}",
+        # Unique within an entity even for writes in the same microsecond.
+        "ts": f"{at}#{uuid.uuid4().hex[:8]}",
+        "day": at[:10],
+        "resource": resource,
+        "item_id": item_id,
+        "action": action,
+        "actor": actor,
+        "at": at,
+        "expires_at": int(time.time()) + AUDIT_RETENTION_DAYS * 86400,
+    }
+    if changes:
+        event["changes"] = changes
+    return event
+
+def record_audit(
+    resource: str,
+    item_id: str,
+    action: str,
+    actor: str = "system",
+    changes: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Queue an audit event for flush_audit(); no I/O on the request path."""
+    if AUDIT_MODE == "buffer":
+        AUDIT_BUFFER.append(audit_event(resource, item_id, action, actor, changes))
+
+def flush_audit() -> int:
+    """Write buffered audit events with BatchWriteItem; returns the count.
+
+    Called once per invocation by the entry points. Failures are logged and
+    dropped so auditing can never fail a request that already succeeded.
+    """
+    if not AUDIT_BUFFER:
+        return 0
+    events = AUDIT_BUFFER[:]
+    del AUDIT_BUFFER[:len(events)]
+    try:
+        unwritten = write_batch_requests(TABLE_AUDIT, [{"PutRequest": {"Item": e}} for e in events])
+    except Exception:
+        # Runs in the entry points' `finally`: connection and timeout errors
+        # (BotoCoreError, not ClientError) must not replace the response.
+        logger.exception("Audit flush failed; dropped %d events", len(events))
+        return 0
+    if unwritten:
+        logger.error("Audit flush left %d of %d events unprocessed", len(unwritten), len(events))
+    return len(events) - len(unwritten)
+
+def list_history(
+    resource: str, item_id: str, limit: int = HISTORY_DEFAULT_LIMIT, last: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Audit events of one item, newest first, with a signed cursor."""
+    table_name(resource)
+    read_page = _wire_reader("query", TABLE_AUDIT)
+    kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": "#e = :e",
+        "ExpressionAttributeNames": {"#e": "entity"},
+        "ExpressionAttributeValues": {":e": f"{resource}#{item_id}"},
+        "ScanIndexForward": False,
+        "Limit": limit,
+    }
+    if last:
+        cursor = decode_cursor(last)
+        if cursor["i"] != "audit" or cursor["k"].get("entity") != f"{resource}#{item_id}":
+            raise ValueError("invalid_cursor")
+        kwargs["ExclusiveStartKey"] = cursor["k"]
+    resp = read_page(**kwargs)
+    items = [
+        {k: v for k, v in e.items() if k not in ("entity", "ts", "day", "expires_at")}
+        for e in resp["Items"]
+    ]
+    next_key = resp.get("LastEvaluatedKey")
+    return items, encode_cursor(next_key, "audit", limit, True) if next_key else None
+
+# -------------------------
+# Dashboard counters
+# -------------------------
+def counters_table():
+    tbl = TABLE_MAP.get("_counters")
+    if tbl is None:
+        tbl = TABLE_MAP["_counters"] = get_dynamodb().Table(TABLE_COUNTERS)
+    return tbl
+
+def counter_deltas(resource: str, item: Dict[str, Any], sign: int = 1) -> Dict[str, int]:
+    """Counter attributes one live item contributes to, each by `sign`."""
+    spec = DASHBOARD_COUNTERS.get(resource, {})
+    deltas = {f"{resource}#total": sign}
+    if spec.get("unread") and not item.get("read"):
+        deltas[f"{resource}#unread"] = sign
+    if spec.get("daily"):
+        day = str(item.get(spec["daily"]) or "")[:10]
+        if DAY_RE.match(day):
+            deltas[f"{resource}#day#{day}"] = sign
+    if spec.get("group_by"):
+        group = spec["group_by"]
+        deltas[f"{resource}#{group}#{item.get(group) or 'none'}"] = sign
+    return deltas
+
+def bump_counters(deltas: Dict[str, int]) -> None:
+    """Apply counter deltas with one atomic ADD on the dashboard item.
+
+    Counters are derived data: failures are logged rather than failing the
+    write that triggered them, and recount_dashboard() repairs drift.
+    """
+    deltas = {name: n for name, n in deltas.items() if n}
+    if not deltas:
+        return
+    names = list(deltas)
+    try:
+        counters_table().update_item(
+            Key={"id": DASHBOARD_COUNTERS_ID},
+            UpdateExpression="ADD " + ", ".join(f"#c{i} :c{i}" for i in range(len(names)))
+            + " SET updated_at = :u",
+            ExpressionAttributeNames={f"#c{i}": name for i, name in enumerate(names)},
+            ExpressionAttributeValues={
+                **{f":c{i}": deltas[name] for i, name in enumerate(names)},
+                ":u": now_iso(),
+            },
+        )
+    except ClientError:
+        logger.exception("Dashboard counter update failed: %s", deltas)
+
+def count_items(resource: str, items: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+    """bump_counters() for several items of one resource in a single write."""
+    deltas: Dict[str, int] = defaultdict(int)
+    for item in items:
+        for name, n in counter_deltas(resource, item, sign).items():
+            deltas[name] += n
+    bump_counters(deltas)
+
+def _window_total(counters: Dict[str, Any], resource: str, first: date, days: int) -> int:
+    return sum(
+        int(counters.get(f"{resource}#day#{(first + timedelta(days=d)).isoformat()}", 0))
+        for d in range(days)
+    )
+
+def dashboard_summary() -> Dict[str, Any]:
+    """Header numbers for the admin dashboard from the single counters item."""
+    resp = counters_table().get_item(Key={"id": DASHBOARD_COUNTERS_ID}, ConsistentRead=False)
+    counters = resp.get("Item") or {}
+    now = datetime.now(timezone.utc)
+    window = DASHBOARD_WINDOW_DAYS
+    summary: Dict[str, Any] = {}
+    for resource, spec in DASHBOARD_COUNTERS.items():
+        stats: Dict[str, Any] = {"total": max(0, int(counters.get(f"{resource}#total", 0)))}
+        if spec.get("unread"):
+            stats["unread"] = max(0, int(counters.get(f"{resource}#unread", 0)))
+        if spec.get("daily"):
+            # created_at buckets are UTC days; calendar "day" buckets are
+            # local, so their today starts at local midnight.
+            today = (now if spec["daily"] == "created_at" else now.astimezone(CALENDAR_TZ)).date()
+            past = today - timedelta(days=window - 1)
+            stats[f"last_{window}_days"] = _window_total(counters, resource, past, window)
+            stats["today"] = _window_total(counters, resource, today, 1)
+            if spec["daily"] != "created_at":
+                stats[f"next_{window}_days"] = _window_total(counters, resource, today, window)
+        if spec.get("group_by"):
+            prefix = f"{resource}#{spec['group_by']}#"
+            stats[f"by_{spec['group_by']}"] = {
+                name[len(prefix):]: int(n)
+                for name, n in counters.items()
+                if name.startswith(prefix) and int(n) > 0
+            }
+        summary[resource] = stats
+    summary["updated_at"] = counters.get("updated_at")
+    return summary
+
+def recount_dashboard() -> Dict[str, Any]:
+    """Rebuild the counters item from the tables (parallel scans).
+
+    Day buckets older than DASHBOARD_KEEP_DAYS are left out. Deltas applied
+    by requests that land while the scan runs are overwritten, so schedule
+    this off-peak.
+    """
+    keep_from = (datetime.now(timezone.utc).date() - timedelta(days=DASHBOARD_KEEP_DAYS)).isoformat()
+    counters: Dict[str, int] = defaultdict(int)
+    for resource in DASHBOARD_COUNTERS:
+        for item in iter_parallel_scan(resource):
+            if item.get("is_deleted"):
+                continue
+            for name, n in counter_deltas(resource, item).items():
+                counters[name] += n
+    for name in [n for n in counters if "#day#" in n and n.rsplit("#", 1)[1] < keep_from]:
+        del counters[name]
+    counters_table().put_item(Item={"id": DASHBOARD_COUNTERS_ID, **counters, "updated_at": now_iso()})
+    logger.info("Recounted dashboard counters: %d attributes", len(counters))
+    return {"counters": len(counters)}
+
+# -------------------------
+# Appointment calendar
+# -------------------------
+class SlotConflict(Exception):
+    """A booking overlaps slots already taken."""
+
+    def __init__(self, conflicts: List[Dict[str, Any]]):
+        super().__init__("slot_conflict")
+        self.conflicts = conflicts
+
+def parse_slot_time(raw: Any, name: str = "datetime") -> datetime:
+    """ISO 8601 date/time as an aware datetime; naive input is local time."""
+    text = str(raw or "").strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"{name} must be ISO 8601, e.g. 2026-10-18T10:30") from None
+    return moment if moment.tzinfo else moment.replace(tzinfo=CALENDAR_TZ)
+
+def slot_key(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime(SLOT_FORMAT)
+
+def calendar_fields(resource: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized start, duration and the derived slot attributes of an item."""
+    spec = CALENDAR_SPECS[resource]
+    start = parse_slot_time(item.get(spec["start"]), spec["start"])
+    minutes = item.get(spec["minutes"])
+    if minutes in (None, ""):
+        minutes = CALENDAR_DEFAULT_MINUTES
+    if isinstance(minutes, bool) or not str(minutes).isdigit():
+        raise ValueError(f"{spec['minutes']} must be a whole number of minutes")
+    minutes = int(minutes)
+    if not 0 < minutes <= CALENDAR_MAX_MINUTES:
+        raise ValueError(f"{spec['minutes']} must be between 1 and {CALENDAR_MAX_MINUTES}")
+    local = start.astimezone(CALENDAR_TZ)
+    return {
+        spec["start"]: local.isoformat(timespec="seconds"),
+        spec["minutes"]: minutes,
+        "starts_at": slot_key(start),
+        "ends_at": slot_key(start + timedelta(minutes=minutes)),
+        "day": local.date().isoformat(),
+        "month": local.strftime("%Y-%m"),
+    }
+
+def occupies_slot(resource: str, item: Dict[str, Any]) -> bool:
+    if item.get("is_deleted"):
+        return False
+    return str(item.get("status") or "").lower() not in CALENDAR_SPECS[resource]["free"]
+
+def calendar_months(first: datetime, last: datetime) -> List[str]:
+    """Local month buckets from `first` through `last`, in order."""
+    year, month = first.astimezone(CALENDAR_TZ).year, first.astimezone(CALENDAR_TZ).month
+    end = last.astimezone(CALENDAR_TZ).strftime("%Y-%m")
+    months = [f"{year:04d}-{month:02d}"]
+    while months[-1] < end:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        months.append(f"{year:04d}-{month:02d}")
+    return months
+
+def _slot_query(resource: str, month: str, low: str, high: str, **kwargs: Any) -> Dict[str, Any]:
+    names = dict(kwargs.pop("ExpressionAttributeNames", {}), **{"#m": "month", "#s": "starts_at"})
+    values = dict(kwargs.pop("ExpressionAttributeValues", {}), **{":m": month, ":lo": low, ":hi": high})
+    return _wire_reader("query", table_name(resource))(
+        IndexName=CALENDAR_INDEX,
+        KeyConditionExpression="#m = :m AND #s BETWEEN :lo AND :hi",
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+        **kwargs,
+    )
+
+def find_conflicts(
+    resource: str, slot: Dict[str, Any], exclude_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Occupied slots overlapping [slot starts_at, ends_at).
+
+    Only slots starting in the CALENDAR_MAX_MINUTES before the end are
+    read, so the cost is an index seek plus the handful of neighbours,
+    however long the calendar's history. The GSI is eventually consistent:
+    two bookings racing within its replication lag can both pass.
+    """
+    start = datetime.strptime(slot["starts_at"], SLOT_FORMAT).replace(tzinfo=timezone.utc)
+    end = datetime.strptime(slot["ends_at"], SLOT_FORMAT).replace(tzinfo=timezone.utc)
+    low = start - timedelta(minutes=CALENDAR_MAX_MINUTES)
+    high = slot_key(end - timedelta(seconds=1))
+    conflicts: List[Dict[str, Any]] = []
+    for month in calendar_months(low, end - timedelta(seconds=1)):
+        kwargs: Dict[str, Any] = {}
+        while True:
+            resp = _slot_query(resource, month, slot_key(low), high, **kwargs)
+            conflicts.extend(
+                {k: other.get(k) for k in ("id", "starts_at", "ends_at", "status")}
+                for other in resp["Items"]
+                if other.get("ends_at", "") > slot["starts_at"]
+                and other["id"] != exclude_id
+                and occupies_slot(resource, other)
+            )
+            if not resp.get("LastEvaluatedKey"):
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    return conflicts
+
+def check_slot(resource: str, item: Dict[str, Any], exclude_id: Optional[str] = None) -> None:
+    if occupies_slot(resource, item):
+        conflicts = find_conflicts(resource, item, exclude_id)
+        if conflicts:
+            raise SlotConflict(conflicts)
+
+def calendar_range(
+    resource: str,
+    start: datetime,
+    end: datetime,
+    limit: Optional[int] = None,
+    last: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    filters: Optional[Dict[str, str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Items whose slot starts in [start, end), in start order, paged."""
+    if end <= start:
+        raise ValueError("to must be after from")
+    if end - start > timedelta(days=CALENDAR_MAX_RANGE_DAYS):
+        raise ValueError(f"range exceeds {CALENDAR_MAX_RANGE_DAYS} days")
+    cursor = decode_cursor(last) if last else None
+    limit = limit or (cursor["n"] if cursor else 50)
+    low, high = slot_key(start), slot_key(end - timedelta(seconds=1))
+    months = calendar_months(start, end - timedelta(seconds=1))
+    kwargs: Dict[str, Any] = {}
+    if cursor:
+        if cursor["i"] != CALENDAR_INDEX or cursor["k"].get("month") not in months:
+            raise ValueError("cursor_mismatch")
+        months = months[months.index(cursor["k"]["month"]):]
+        kwargs["ExclusiveStartKey"] = cursor["k"]
+    names: Dict[str, str] = {}
+    values: Dict[str, Any] = {}
+    filter_parts = filter_terms(resource, filters or {}, names, values)
+    if resource in SOFT_DELETE_RESOURCES:
+        names["#del"] = "is_deleted"
+        values[":false"] = False
+        filter_parts.append("(attribute_not_exists(#del) OR #del = :false)")
+    if filter_parts:
+        kwargs.update(
+            FilterExpression=" AND ".join(filter_parts),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    if fields:
+        projected = list(dict.fromkeys(["id", "month", "starts_at"] + fields))
+        kwargs["ProjectionExpression"] = ", ".join(f"#p{i}" for i in range(len(projected)))
+        kwargs["ExpressionAttributeNames"] = dict(
+            kwargs.get("ExpressionAttributeNames", {}), **{f"#p{i}": f for i, f in enumerate(projected)}
+        )
+
+    items: List[Dict[str, Any]] = []
+    next_key: Optional[Dict[str, Any]] = None
+    for pos, month in enumerate(months):
+        while True:
+            resp = _slot_query(resource, month, low, high, Limit=limit - len(items), **kwargs)
+            items.extend(resp["Items"])
+            page_key = resp.get("LastEvaluatedKey")
+            kwargs.pop("ExclusiveStartKey", None)
+            if not page_key:
+                break
+            if len(items) >= limit:
+                next_key = page_key
+                break
+            kwargs["ExclusiveStartKey"] = page_key
+        if next_key:
+            break
+        if len(items) >= limit and pos + 1 < len(months):
+            # Page filled exactly at a month's end; resume after its last item.
+            next_key = {k: items[-1][k] for k in ("id", "month", "starts_at")}
+            break
+    return items, encode_cursor(next_key, CALENDAR_INDEX, limit, False) if next_key else None
+
+def backfill_calendar(resource: str) -> Dict[str, Any]:
+    """Derive slot attributes for items written before the calendar index.
+
+    Items whose start cannot be parsed are counted and left as they are.
+    """
+    table = choose_table(resource)
+    updated = skipped = 0
+    for item in iter_parallel_scan(resource):
+        if item.get("starts_at"):
+            continue
+        try:
+            derived = calendar_fields(resource, item)
+        except ValueError:
+            skipped += 1
+            continue
+        try:
+            table.update_item(
+                Key={"id": item["id"]},
+                UpdateExpression="SET " + ", ".join(f"#d{i} = :d{i}" for i in range(len(derived)))
+                + " ADD version :one",
+                ConditionExpression="attribute_exists(id) AND attribute_not_exists(starts_at)",
+                ExpressionAttributeNames={f"#d{i}": k for i, k in enumerate(derived)},
+                ExpressionAttributeValues={
+                    **{f":d{i}": v for i, v in enumerate(derived.values())},
+                    ":one": 1,
+                },
+            )
+        except ClientError as e:
+            if not _conditional_failed(e):
+                raise
+            continue  # deleted or rescheduled through the API meanwhile
+        updated += 1
+    READ_CACHE.invalidate_resource(resource)
+    logger.info("Calendar backfill on %s: %d updated, %d unparseable", resource, updated, skipped)
+    return {"resource": resource, "updated": updated, "skipped": skipped}
+
+# -------------------------
+# CRUD operations
+# -------------------------
+class VersionConflict(Exception):
+    """A conditional write found the item at a different version."""
+
+    def __init__(self, current: Optional[Dict[str, Any]]):
+        super().__init__("version_conflict")
+        self.current = current
+
+def _conditional_failed(e: ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+def create_resource_item(resource: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    table = choose_table(resource)
+    base = build_resource_item(resource, payload)
+    logger.info("Creating %s item in table %s: id=%s", resource, table.table_name, base["id"])
+    if resource == "files" and base.get("s3_key"):
+        # The ObjectCreated consumer may have written this row first; keep
+        # the object metadata it recorded.
+        old = from_resource(table.put_item(Item=base, ReturnValues="ALL_OLD").get("Attributes") or {})
+        carried = {f: old[f] for f in INGESTED_FILE_FIELDS if f in old and f not in base}
+        if not old:
+            count_items(resource, [base])
+        else:
+            carried["version"] = int(old.get("version") or 0) + 1
+            table.update_item(
+                Key={"id": base["id"]},
+                UpdateExpression="SET " + ", ".join(f"#c{i} = :c{i}" for i in range(len(carried))),
+                ExpressionAttributeNames={f"#c{i}": f for i, f in enumerate(carried)},
+                ExpressionAttributeValues={f":c{i}": v for i, v in enumerate(carried.values())},
+            )
+            base.update(carried)
+    else:
+        if resource in CALENDAR_SPECS:
+            check_slot(resource, base)
+        table.put_item(Item=base)
+        count_items(resource, [base])
+    READ_CACHE.invalidate_resource(resource, base["id"])
+    index_documents(resource, [base])
+    record_audit(resource, base["id"], "CREATE", payload.get("updated_by", "system"))
+    return base
+
+def build_resource_item(
+    resource: str, payload: Dict[str, Any], item_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Assemble a new item from a create payload; raises ValueError if invalid.
+
+    `item_id` is for ids reserved ahead of the write (batch uploads).
+    """
+    choose_table(resource)
+    if item_id is None and resource == "files":
+        key = payload.get("s3_key") or s3_key_for(payload)
+        if key and key.startswith(UPLOAD_PREFIX):
+            item_id = file_id_for_key(key)
+    item_id = item_id or str(uuid.uuid4())
+    base: Dict[str, Any] = {
+        "id": item_id,
+        "resource": resource,
+        "form_id": payload.get("form_id", resource),
+        "created_at": now_iso(),
+        "read": False,
+        "version": 1,
+    }
+
+    # Schema fields (normalized) plus any extra payload fields.
+    base.update(NORMALIZERS[resource](payload))
+    if resource in CALENDAR_SPECS:
+        base.update(calendar_fields(resource, base))
+
+    if resource == "files" and not base.get("s3_key"):
+        key = s3_key_for(base)
+        if key:
+            base["s3_key"] = key
+
+    # DynamoDB rejects empty strings in index keys; leave them out so the
+    # item simply stays out of that (sparse) index.
+    for attr in INDEXED_ATTRS.get(resource, ()):
+        if base.get(attr) == "":
+            del base[attr]
+    return base
+
+def list_resource_items(
+    resource: str,
+    limit: Optional[int] = None,
+    last: Optional[str] = None,
+    filters: Optional[Dict[str, str]] = None,
+    descending: bool = True,
+    allow_scan: bool = False,
+    include_deleted: bool = False,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    name = table_name(resource)
+    filters = filters or {}
+    cursor = decode_cursor(last) if last else None
+    limit = limit or (cursor["n"] if cursor else 50)
+    kwargs: Dict[str, Any] = {"Limit": limit}
+    names: Dict[str, str] = {}
+    values: Dict[str, Any] = {}
+
+    index, pk_value = (None, None) if allow_scan else choose_index(resource, filters)
+
+    # Soft-deleted items stay in the table as tombstones until compaction,
+    # and filters the key condition does not cover narrow the page
+    # server-side.
+    filter_parts: List[str] = []
+    if not include_deleted:
+        names["#del"] = "is_deleted"
+        values[":false"] = False
+        filter_parts.append("(attribute_not_exists(#del) OR #del = :false)")
+    used = {index["pk"], index["sk"]} if index else set()
+    filter_parts += filter_terms(resource, {k: v for k, v in filters.items() if k not in used}, names, values)
+    if filter_parts:
+        kwargs["FilterExpression"] = " AND ".join(filter_parts)
+
+    if index is None:
+        if not allow_scan:
+            raise ValueError(f"no index available to list '{resource}'; pass scan=true")
+        operation = "scan"
+        key_attrs = ["id"]
+    else:
+        names["#pk"] = index["pk"]
+        values[":pk"] = pk_value
+        key_cond = "#pk = :pk"
+        if filters.get(index["sk"]):
+            names["#sk"] = index["sk"]
+            values[":sk"] = filters[index["sk"]]
+            key_cond += " AND #sk = :sk"
+        kwargs.update(
+            IndexName=index["name"],
+            KeyConditionExpression=key_cond,
+            ScanIndexForward=not descending,
+        )
+        operation = "query"
+        key_attrs = ["id", index["pk"], index["sk"]]
+
+    if fields:
+        # Key attributes are always projected so the page cursor can be built.
+        projected = list(dict.fromkeys(key_attrs + fields))
+        projection = {f"#p{i}": f for i, f in enumerate(projected)}
+        kwargs["ProjectionExpression"] = ", ".join(projection)
+        names.update(projection)
+
+    if names:
+        kwargs["ExpressionAttributeNames"] = names
+    if values:
+        kwargs["ExpressionAttributeValues"] = values
+
+    # A cursor is only valid for the access path and direction that issued it.
+    index_name = index["name"] if index else None
+    if cursor:
+        if cursor["i"] != (index_name or "") or cursor["d"] != int(descending):
+            raise ValueError("cursor_mismatch")
+        if index and cursor["k"].get(index["pk"]) != pk_value:
+            raise ValueError("cursor_mismatch")
+        kwargs["ExclusiveStartKey"] = cursor["k"]
+
+    if DATA_ACCESS_MODE == "client":
+        read_page = _wire_reader(operation, name)
+    else:
+        read_page = getattr(choose_table(resource), operation)
+
+    # Limit caps items *evaluated*, not items returned, so keep reading until
+    # the page holds `limit` live items or the table is exhausted.
+    items, last_key = _fill_page(read_page, kwargs, limit, key_attrs)
+    logger.info(
+        "Listed %d items from %s via %s (limit=%s)",
+        len(items),
+        name,
+        index_name or "scan",
+        limit,
+    )
+    next_cursor = encode_cursor(last_key, index_name, limit, descending) if last_key else None
+    return items, next_cursor
+
+def filter_terms(
+    resource: str, filters: Dict[str, Any], names: Dict[str, str], values: Dict[str, Any]
+) -> List[str]:
+    """Equality FilterExpression terms for `filters`; raises ValueError on a
+    key that cannot be an attribute name. "true"/"false" match booleans on
+    boolean fields."""
+    terms = []
+    for i, (attr, value) in enumerate(sorted(filters.items())):
+        if value in ("", None):
+            continue
+        if not FIELD_NAME_RE.match(attr):
+            raise ValueError(f"invalid filter field: {attr}")
+        if attr in BOOL_FIELDS.get(resource, ()) and value in ("true", "false"):
+            value = value == "true"
+        names[f"#f{i}"] = attr
+        values[f":f{i}"] = value
+        terms.append(f"#f{i} = :f{i}")
+    return terms
+
+def _wire_reader(operation: str, name: str):
+    """Wrap a low-level query/scan so it takes and returns plain values."""
+    call = getattr(get_dynamodb_client(), operation)
+
+    def read_page(**kwargs: Any) -> Dict[str, Any]:
+        request = dict(kwargs, TableName=name)
+        if "ExpressionAttributeValues" in request:
+            request["ExpressionAttributeValues"] = item_to_wire(request["ExpressionAttributeValues"])
+        if "ExclusiveStartKey" in request:
+            request["ExclusiveStartKey"] = item_to_wire(request["ExclusiveStartKey"])
+        resp = call(**request)
+        out = {"Items": [item_from_wire(i) for i in resp.get("Items", [])]}
+        if resp.get("LastEvaluatedKey"):
+            out["LastEvaluatedKey"] = item_from_wire(resp["LastEvaluatedKey"])
+        if resp.get("ConsumedCapacity"):
+            out["ConsumedCapacity"] = resp["ConsumedCapacity"]
+        return out
+
+    return read_page
+
+def _fill_page(
+    read_page,
+    kwargs: Dict[str, Any],
+    limit: int,
+    key_attrs: List[str],
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    items: List[Dict[str, Any]] = []
+    last_key: Optional[Dict[str, Any]] = None
+    for _ in range(MAX_PAGE_READS):
+        resp = read_page(**kwargs)
+        items.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if len(items) >= limit or not last_key:
+            break
+        kwargs["ExclusiveStartKey"] = last_key
+
+    if len(items) > limit:
+        # Overshot: resume right after the last item we hand back.
+        items = items[:limit]
+        last_key = {k: items[-1][k] for k in key_attrs if k in items[-1]}
+    return items, last_key
+
+def get_resource_item(resource: str, item_id: str) -> Optional[Dict[str, Any]]:
+    name = table_name(resource)
+    cache_key = ("item", resource, item_id)
+    item = READ_CACHE.get(cache_key)
+    if item is not None:
+        return item
+    if DATA_ACCESS_MODE == "client":
+        resp = get_dynamodb_client().get_item(TableName=name, Key={"id": {"S": item_id}})
+        item = item_from_wire(resp["Item"]) if resp.get("Item") else None
+    else:
+        item = choose_table(resource).get_item(Key={"id": item_id}).get("Item")
+    logger.info("Get item from %s id=%s found=%s", name, item_id, bool(item))
+    if item:
+        READ_CACHE.set(cache_key, item, cache_ttl(resource))
+    return item
+
+def update_read_flag(resource: str, item_id: str, read_flag: bool) -> Optional[Dict[str, Any]]:
+    table = choose_table(resource)
+    stamp = now_iso()
+    try:
+        resp = table.update_item(
+            Key={"id": item_id},
+            UpdateExpression="SET #r = :v, updated_at = :u ADD version :one",
+            ConditionExpression="attribute_exists(id)",
+            ExpressionAttributeNames={"#r": "read"},
+            ExpressionAttributeValues={":v": read_flag, ":u": stamp, ":one": 1},
+            # The old image tells us whether the unread counter moves.
+            ReturnValues="ALL_OLD",
+        )
+    except ClientError as e:
+        if _conditional_failed(e):
+            return None
+        raise
+    READ_CACHE.invalidate_resource(resource, item_id)
+    old = from_resource(resp["Attributes"])
+    item = dict(old, read=read_flag, updated_at=stamp, version=int(old.get("version") or 0) + 1)
+    record_audit(resource, item_id, "READ_FLAG", "admin", {"read": read_flag})
+    if DASHBOARD_COUNTERS.get(resource, {}).get("unread") and not old.get("is_deleted"):
+        if bool(old.get("read")) != read_flag:
+            bump_counters({f"{resource}#unread": -1 if read_flag else 1})
+    logger.info("Updated read flag on %s id=%s to %s", table.table_name, item_id, read_flag)
+    return item
+
+def delete_resource_item(resource: str, item_id: str) -> bool:
+    table = choose_table(resource)
+    # existing = table.get_item(Key={"id": item_id}).get("Item")
+    # if not existing:
+    #     logger.info("Delete requested for %s id=%s but item not found", table.table_name, item_id)
+    #     return False
+    if resource in SOFT_DELETE_RESOURCES:
+        # Only the first tombstoning of a live item moves the counters.
+        try:
+            old = table.update_item(
+                Key={"id": item_id},
+                UpdateExpression="SET is_deleted = :d, deleted_at = :t ADD version :one",
+                ConditionExpression=(
+                    "attribute_exists(id) AND (attribute_not_exists(is_deleted) OR is_deleted <> :d)"
+                ),
+                ExpressionAttributeValues={":d": True, ":t": now_iso(), ":one": 1},
+                ReturnValues="ALL_OLD",
+            )["Attributes"]
+            count_items(resource, [old], -1)
+        except ClientError as e:
+            if not _conditional_failed(e):
+                raise
+        READ_CACHE.invalidate_resource(resource, item_id)
+        index_documents(resource, [], deleted_ids=[item_id])
+        record_audit(resource, item_id, "DELETE", "admin")
+        return True
+    old = table.delete_item(Key={"id": item_id}, ReturnValues="ALL_OLD").get("Attributes")
+    if old:
+        count_items(resource, [old], -1)
+    READ_CACHE.invalidate_resource(resource, item_id)
+    index_documents(resource, [], deleted_ids=[item_id])
+    record_audit(resource, item_id, "DELETE", "admin")
+    logger.info("Deleted %s id=%s from table %s", resource, item_id, table.table_name)
+    return True
+
+def partial_update_item(
+    resource: str,
+    item_id: str,
+    updates: Dict[str, Any],
+    expected_version: Optional[int] = None,
+    return_values: str = "ALL_NEW",
+) -> Optional[Dict[str, Any]]:
+    """Conditionally SET `updates` on an existing item and bump its version.
+
+    Returns None if the item does not exist. With `expected_version` the
+    write only applies at that version, else VersionConflict is raised.
+    return_values "UPDATED_NEW" returns just the written attributes (plus
+    id and version) instead of the whole item.
+    """
+    table = choose_table(resource)
+    updates.pop("id", None)
+    updates.pop("audit", None)
+    if expected_version is None and "version" in updates:
+        expected_version = int(updates["version"])
+    updates.pop("version", None)
+    if not updates:
+        return None
+
+    if resource == "files" and "file_url" in updates and "s3_key" not in updates:
+        updates["s3_key"] = s3_key_for({"file_url": updates["file_url"]}) or ""
+
+    # Moving, resizing or re-activating a booking re-derives its slot and
+    # checks it; the write is then pinned to the version that was checked.
+    calendar = CALENDAR_SPECS.get(resource)
+    before = None
+    if calendar and set(updates) & {calendar["start"], calendar["minutes"], "status"}:
+        before = from_resource(table.get_item(Key={"id": item_id}, ConsistentRead=True).get("Item"))
+        if before is None:
+            return None
+        version = int(before.get("version") or 0)
+        if expected_version is not None and expected_version != version:
+            raise VersionConflict(before)
+        # Clients echo the stored start back on every save; only a real
+        # move or resize is validated, so legacy free-form rows stay editable.
+        for key in (calendar["start"], calendar["minutes"]):
+            if key in updates and key in before and updates[key] == before[key]:
+                del updates[key]
+        try:
+            updates.update(calendar_fields(resource, dict(before, **updates)))
+        except ValueError:
+            if set(updates) & {calendar["start"], calendar["minutes"]}:
+                raise
+            # Status change on an item whose legacy start does not parse.
+        else:
+            check_slot(resource, dict(before, **updates), exclude_id=item_id)
+        expected_version = version
+
+    expr_parts = []
+    remove_parts = []
+    expr_names: Dict[str, str] = {}
+    expr_values: Dict[str, Any] = {}
+    indexed = INDEXED_ATTRS.get(resource, set())
+    idx = 0
+    for k, v in updates.items():
+        idx += 1
+        name_key = f"#f{idx}"
+        val_key = f":v{idx}"
+        expr_names[name_key] = k
+        if v == "" and k in indexed:
+            # DynamoDB rejects empty index keys; clearing drops the attribute
+            # and the item leaves that (sparse) index, as on create.
+            remove_parts.append(name_key)
+            continue
+        expr_parts.append(f"{name_key} = {val_key}")
+        expr_values[val_key] = v
+
+    expr_parts.append("#u = :u")
+    expr_names["#u"] = "updated_at"
+    expr_values[":u"] = now_iso()
+    expr_names["#ver"] = "version"
+    expr_values[":one"] = 1
+
+    condition = "attribute_exists(id)"
+    if expected_version is not None:
+        expr_values[":ev"] = expected_version
+        # Items written before versioning have no attribute; they are v0.
+        if expected_version == 0:
+            condition += " AND (attribute_not_exists(#ver) OR #ver = :ev)"
+        else:
+            condition += " AND #ver = :ev"
+
+    # The search index needs the whole document when searchable text changes.
+    reindex = bool(set(updates) & set(SEARCH_FIELDS.get(resource, ())))
+    update_expr = "SET " + ", ".join(expr_parts) + " ADD #ver :one"
+    if remove_parts:
+        update_expr += " REMOVE " + ", ".join(remove_parts)
+    try:
+        resp = table.update_item(
+            Key={"id": item_id},
+            UpdateExpression=update_expr,
+            ConditionExpression=condition,
+            ExpressionAttributeNames=expr_names,
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_NEW" if reindex or return_values == "ALL_NEW" else "UPDATED_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except ClientError as e:
+        if not _conditional_failed(e):
+            raise
+        # Error responses are not deserialized by the resource layer.
+        current = item_from_wire(e.response["Item"]) if e.response.get("Item") else None
+        if current is None and expected_version is not None:
+            # Older SDKs/emulators do not echo the item; look it up.
+            current = from_resource(table.get_item(Key={"id": item_id}).get("Item"))
+        if current is None:
+            return None
+        READ_CACHE.invalidate_resource(resource, item_id)
+        raise VersionConflict(current)
+
+    READ_CACHE.invalidate_resource(resource, item_id)
+    attrs = from_resource(resp.get("Attributes") or {})
+    attrs["version"] = int(attrs.get("version") or 0)
+    if before is not None and not before.get("is_deleted"):
+        # A moved booking changes day buckets; the total nets to zero.
+        deltas = counter_deltas(resource, before, -1)
+        for name, n in counter_deltas(resource, dict(before, **updates)).items():
+            deltas[name] = deltas.get(name, 0) + n
+        bump_counters(deltas)
+    if reindex:
+        index_documents(resource, [attrs])
+    record_audit(resource, item_id, "UPDATE", updates.get("updated_by", "admin"), updates)
+    logger.info(
+        "Partially updated %s id=%s fields=%s version=%s",
+        table.table_name,
+        item_id,
+        list(updates.keys()),
+        attrs.get("version"),
+    )
+    if return_values == "UPDATED_NEW":
+        keep = set(updates) | {"updated_at", "version"}
+        attrs = dict({k: v for k, v in attrs.items() if k in keep}, id=item_id)
+    return attrs
+
+# -------------------------
+# Request handlers
+# -------------------------
+# Each handler takes the request context built by route():
+#   event, method, path, parts (path segments), params (template values),
+#   qs, body.
+# Validators take the same context and return an error string or None.
+def validate_batch_write(req: Dict[str, Any]) -> Optional[str]:
+    creates = req["body"].get("create") or []
+    deletes = req["body"].get("delete") or []
+    if not isinstance(creates, list) or not isinstance(deletes, list):
+        return "'create' and 'delete' must be lists"
+    if not creates and not deletes:
+        return "no_batch_operations_provided"
+    if len(creates) + len(deletes) > MAX_BATCH_ITEMS:
+        return f"at most {MAX_BATCH_ITEMS} operations per batch"
+    return None
+
+def validate_batch_get(req: Dict[str, Any]) -> Optional[str]:
+    ids = req["body"].get("ids") or []
+    if not isinstance(ids, list) or not ids:
+        return "'ids' list required"
+    if len(ids) > MAX_BATCH_ITEMS:
+        return f"at most {MAX_BATCH_ITEMS} ids per batch"
+    return None
+
+def validate_download_batch(req: Dict[str, Any]) -> Optional[str]:
+    ids = req["body"].get("ids") or []
+    if not isinstance(ids, list) or not ids:
+        return "'ids' list required"
+    if len(ids) > MAX_DOWNLOAD_BATCH:
+        return f"at most {MAX_DOWNLOAD_BATCH} ids per batch"
+    return None
+
+def validate_bulk_update(req: Dict[str, Any]) -> Optional[str]:
+    field = req["parts"][-1]
+    expected_type, label = BULK_UPDATE_FIELDS[field]
+    if not isinstance(req["body"].get(field), expected_type):
+        return f"'{field}' {label} required in body"
+    ids = req["body"].get("ids")
+    if ids is None and isinstance(req["body"].get("filter"), dict):
+        # An empty value would match nothing narrower than the whole table.
+        if any(v in ("", None) for v in req["body"]["filter"].values()):
+            return "filter values must not be empty"
+        return None
+    if not isinstance(ids, list) or not ids:
+        return "'ids' list or 'filter' object required"
+    if len(ids) > MAX_BATCH_ITEMS:
+        return f"at most {MAX_BATCH_ITEMS} ids per batch"
+    return None
+
+def validate_export(req: Dict[str, Any]) -> Optional[str]:
+    body = req["body"]
+    if body.get("format", "ndjson") not in EXPORT_FORMATS:
+        return f"format must be one of {sorted(EXPORT_FORMATS)}"
+    if not isinstance(body.get("filter", {}), dict):
+        return "'filter' must be an object"
+    if not isinstance(body.get("fields", "all"), (str, list)):
+        return "'fields' must be a string or a list"
+    return None
+
+def validate_list(req: Dict[str, Any]) -> Optional[str]:
+    limit = req["qs"].get("limit")
+    if limit and (not limit.isdigit() or int(limit) < 1):
+        return "limit must be a positive integer"
+    return None
+
+def validate_search(req: Dict[str, Any]) -> Optional[str]:
+    if not req["qs"].get("q", "").strip():
+        return "'q' query parameter required"
+    limit = req["qs"].get("limit", str(SEARCH_DEFAULT_LIMIT))
+    if not limit.isdigit() or not 1 <= int(limit) <= SEARCH_MAX_LIMIT:
+        return f"limit must be between 1 and {SEARCH_MAX_LIMIT}"
+    return None
+
+def validate_upload_batch(req: Dict[str, Any]) -> Optional[str]:
+    files = req["body"].get("files")
+    if not isinstance(files, list) or not files:
+        return "'files' list required"
+    if len(files) > MAX_UPLOAD_BATCH:
+        return f"at most {MAX_UPLOAD_BATCH} files per batch"
+    for f in files:
+        if not isinstance(f, dict) or not isinstance(f.get("filename"), str) or not f["filename"].strip():
+            return "each file needs a filename"
+        size = f.get("size")
+        if size is not None and (isinstance(size, bool) or not isinstance(size, int) or not 0 < size <= MAX_UPLOAD_BYTES):
+            return f"size must be an integer between 1 and {MAX_UPLOAD_BYTES}"
+    return None
+
+def validate_upload_finalize(req: Dict[str, Any]) -> Optional[str]:
+    files = req["body"].get("files")
+    if not isinstance(files, list) or not files:
+        return "'files' list required"
+    if not all(isinstance(f, dict) and f.get("file_id") for f in files):
+        return "each file needs a file_id"
+    return None
+
+def validate_upload_complete(req: Dict[str, Any]) -> Optional[str]:
+    parts = req["body"].get("parts")
+    if parts is None:
+        return None
+    if not isinstance(parts, list) or not all(
+        isinstance(p, dict) and isinstance(p.get("part_number"), int) and p.get("etag") for p in parts
+    ):
+        return "'parts' must be a list of {part_number, etag}"
+    return None
+
+def validate_read_flag(req: Dict[str, Any]) -> Optional[str]:
+    if not isinstance(req["body"].get("read"), bool):
+        return "'read' boolean required in body"
+    return None
+
+def validate_update(req: Dict[str, Any]) -> Optional[str]:
+    return None if req["body"] else "no_update_fields_provided"
+
+def handle_presigned_upload(req: Dict[str, Any]) -> Dict[str, Any]:
+    return create_presigned_upload(req["event"])
+
+def handle_upload_batch(req: Dict[str, Any]) -> Dict[str, Any]:
+    return create_upload_batch(req["body"]["files"])
+
+def handle_upload_batch_finalize(req: Dict[str, Any]) -> Dict[str, Any]:
+    return finalize_upload_batch(req["params"]["id"], req["body"]["files"])
+
+def handle_upload_resume(req: Dict[str, Any]) -> Dict[str, Any]:
+    return resume_multipart_upload(req["params"]["id"])
+
+def handle_upload_complete(req: Dict[str, Any]) -> Dict[str, Any]:
+    return complete_multipart_upload(req["params"]["id"], req["body"].get("parts"))
+
+def handle_upload_abort(req: Dict[str, Any]) -> Dict[str, Any]:
+    return abort_multipart_upload(req["params"]["id"])
+
+def handle_presigned_downloads(req: Dict[str, Any]) -> Dict[str, Any]:
+    return create_presigned_downloads([str(i) for i in req["body"]["ids"]])
+
+def handle_presigned_download(req: Dict[str, Any]) -> Dict[str, Any]:
+    return create_presigned_download(req["params"]["id"])
+
+def handle_cache_stats(req: Dict[str, Any]) -> Dict[str, Any]:
+    return make_response(200, READ_CACHE.stats())
+
+def handle_dashboard_summary(req: Dict[str, Any]) -> Dict[str, Any]:
+    return make_conditional_response(req["event"], "dashboard", dashboard_summary())
+
+def slot_conflict_response(sc: SlotConflict) -> Dict[str, Any]:
+    return make_response(409, {"error": "slot_conflict", "conflicts": sc.conflicts})
+
+def handle_create(req: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        created = create_resource_item(req["params"]["resource"], req["body"])
+    except SlotConflict as sc:
+        return slot_conflict_response(sc)
+    return make_response(201, created)
+
+def handle_batch_write(req: Dict[str, Any]) -> Dict[str, Any]:
+    results = batch_write_items(
+        req["params"]["resource"],
+        req["body"].get("create") or [],
+        req["body"].get("delete") or [],
+    )
+    return make_response(200, {"results": results})
+
+def handle_batch_get(req: Dict[str, Any]) -> Dict[str, Any]:
+    ids = [str(i) for i in req["body"]["ids"]]
+    items, missing, unprocessed = batch_get_items(req["params"]["resource"], ids)
+    return make_response(200, {"items": items, "missing": missing, "unprocessed": unprocessed})
+
+def handle_list(req: Dict[str, Any]) -> Dict[str, Any]:
+    resource = req["params"]["resource"]
+    qs = req["qs"]
+    cache_key = ("list", resource, tuple(sorted(qs.items())))
+    if resource in CACHED_LIST_RESOURCES:
+        cached = READ_CACHE.get(cache_key)
+        if cached is not None:
+            return make_conditional_response(req["event"], resource, cached)
+    limit = min(int(qs["limit"]), MAX_PAGE_SIZE) if qs.get("limit") else None
+    if resource in CALENDAR_SPECS and ("from" in qs or "to" in qs):
+        if not qs.get("from") or not qs.get("to"):
+            raise ValueError("from and to are both required")
+        start = parse_slot_time(qs["from"], "from")
+        end = parse_slot_time(qs["to"], "to")
+        if "T" not in qs["to"]:
+            end += timedelta(days=1)  # a bare end date includes that day
+        items, next_cursor = calendar_range(
+            resource, start, end, limit=limit, last=qs.get("last"),
+            fields=parse_fields(resource, qs.get("fields")),
+            filters={k: v for k, v in qs.items() if k not in LIST_CONTROL_PARAMS},
+        )
+        body = {"items": items, "last": next_cursor, "prefetch": next_cursor is not None}
+        return make_conditional_response(req["event"], resource, body)
+    filters = {k: v for k, v in qs.items() if k not in LIST_CONTROL_PARAMS}
+    items, next_cursor = list_resource_items(
+        resource,
+        limit=limit,
+        last=qs.get("last"),
+        filters=filters,
+        descending=qs.get("order", "desc") != "asc",
+        allow_scan=qs.get("scan") == "true",
+        include_deleted=qs.get("include_deleted") == "true",
+        fields=parse_fields(resource, qs.get("fields")),
+    )
+    body = {
+        "items": items,
+        "last": next_cursor,
+        # Tell the dashboard a further page exists so it can prefetch.
+        "prefetch": next_cursor is not None,
+    }
+    if qs.get("estimate") == "true":
+        body["total_estimate"] = estimate_total(resource)
+    if resource in CACHED_LIST_RESOURCES:
+        READ_CACHE.set(cache_key, body, cache_ttl(resource))
+    return make_conditional_response(req["event"], resource, body)
+
+def handle_export(req: Dict[str, Any]) -> Dict[str, Any]:
+    resource = req["params"]["resource"]
+    body = req["body"]
+    fields = body.get("fields", "all")
+    job = start_export(
+        resource,
+        body.get("format", "ndjson"),
+        filters=body.get("filter") or {},
+        fields=parse_fields(resource, ",".join(fields) if isinstance(fields, list) else fields),
+    )
+    return make_response(202, dict(job, poll=f"/exports/{job['job_id']}"))
+
+def handle_export_status(req: Dict[str, Any]) -> Dict[str, Any]:
+    job = get_upload_state(req["params"]["id"])
+    if not job or job.get("kind") != "export":
+        return make_response(404, {"error": "export_not_found"})
+    return make_response(200, export_job_view(job))
+
+def handle_search(req: Dict[str, Any]) -> Dict[str, Any]:
+    resource = req["params"]["resource"]
+    qs = req["qs"]
+    body = search_resource(
+        resource,
+        qs["q"],
+        limit=int(qs.get("limit", SEARCH_DEFAULT_LIMIT)),
+        fields=parse_fields(resource, qs.get("fields")),
+    )
+    return make_response(200, body)
+
+def handle_get(req: Dict[str, Any]) -> Dict[str, Any]:
+    resource = req["params"]["resource"]
+    item = get_resource_item(resource, req["params"]["id"])
+    if not item:
+        return make_response(404, {"error": "not_found"})
+    return make_conditional_response(req["event"], resource, item, etag=item_etag(item))
+
+def handle_bulk_update(req: Dict[str, Any]) -> Dict[str, Any]:
+    resource = req["params"]["resource"]
+    field = req["parts"][-1]
+    ids = req["body"].get("ids")
+    truncated = False
+    if ids is None:
+        ids, truncated = collect_ids(resource, req["body"]["filter"], MAX_BATCH_ITEMS)
+        if not ids:
+            return make_response(200, {"results": [], "truncated": False})
+    results = bulk_update_field(resource, [str(i) for i in ids], field, req["body"][field])
+    return make_response(200, {"results": results, "truncated": truncated})
+
+def handle_history(req: Dict[str, Any]) -> Dict[str, Any]:
+    params = req["params"]
+    qs = req["qs"]
+    limit = min(int(qs.get("limit") or HISTORY_DEFAULT_LIMIT), HISTORY_MAX_LIMIT)
+    items, next_cursor = list_history(params["resource"], params["id"], limit, qs.get("last"))
+    return make_response(200, {"items": items, "last": next_cursor})
+
+def handle_read_flag(req: Dict[str, Any]) -> Dict[str, Any]:
+    params = req["params"]
+    updated = update_read_flag(params["resource"], params["id"], req["body"]["read"])
+    if not updated:
+        return make_response(404, {"error": "not_found"})
+    return make_response(200, updated)
+
+def handle_update(req: Dict[str, Any]) -> Dict[str, Any]:
+    params = req["params"]
+    prefer = (get_header(req["event"], "Prefer") or "").replace(" ", "").lower()
+    minimal = "return=minimal" in prefer.split(",") or req["qs"].get("return") == "updated"
+    try:
+        updated = partial_update_item(
+            params["resource"],
+            params["id"],
+            req["body"],
+            expected_version=parse_if_match(req["event"]),
+            return_values="UPDATED_NEW" if minimal else "ALL_NEW",
+        )
+    except VersionConflict as vc:
+        return make_response(
+            409,
+            {"error": "version_conflict", "current_version": int(vc.current.get("version") or 0)},
+            {"ETag": item_etag(vc.current)},
+        )
+    except SlotConflict as sc:
+        return slot_conflict_response(sc)
+    if not updated:
+        return make_response(404, {"error": "not_found_or_no_change"})
+    return make_response(200, updated, {"ETag": item_etag(updated)})
+
+def handle_delete(req: Dict[str, Any]) -> Dict[str, Any]:
+    params = req["params"]
+    deleted = delete_resource_item(params["resource"], params["id"])
+    if not deleted:
+        return make_response(404, {"error": "not_found"})
+    return make_response(204, None)
+
+# -------------------------
+# Router
+# -------------------------
+# (method, path template, handler, validator). Literal segments win over
+# {placeholders}, so /files/upload is tried before /{resource}/{id}.
+ROUTES = [
+    ("POST", "/files/upload", handle_presigned_upload, None),
+    ("POST", "/files/upload/batch", handle_upload_batch, validate_upload_batch),
+    ("POST", "/files/upload/batch/{id}/finalize", handle_upload_batch_finalize, validate_upload_finalize),
+    ("GET", "/files/upload/{id}", handle_upload_resume, None),
+    ("POST", "/files/upload/{id}/complete", handle_upload_complete, validate_upload_complete),
+    ("DELETE", "/files/upload/{id}", handle_upload_abort, None),
+    ("GET", "/files/download/{id}", handle_presigned_download, None),
+    ("POST", "/files/download", handle_presigned_downloads, validate_download_batch),
+    ("GET", "/cache/stats", handle_cache_stats, None),
+    ("GET", "/dashboard/summary", handle_dashboard_summary, None),
+    ("POST", "/{resource}", handle_create, None),
+    ("POST", "/{resource}/batch", handle_batch_write, validate_batch_write),
+    ("POST", "/{resource}/batch-get", handle_batch_get, validate_batch_get),
+    ("GET", "/{resource}", handle_list, validate_list),
+    ("POST", "/{resource}/export", handle_export, validate_export),
+    ("GET", "/exports/{id}", handle_export_status, None),
+    ("GET", "/{resource}/search", handle_search, validate_search),
+    ("GET", "/{resource}/{id}", handle_get, None),
+    ("GET", "/{resource}/{id}/history", handle_history, None),
+    ("PATCH", "/{resource}/read", handle_bulk_update, validate_bulk_update),
+    ("PATCH", "/{resource}/status", handle_bulk_update, validate_bulk_update),
+    ("PATCH", "/{resource}/{id}/read", handle_read_flag, validate_read_flag),
+    ("PUT", "/{resource}/{id}", handle_update, validate_update),
+    ("DELETE", "/{resource}/{id}", handle_delete, None),
+]
+
+def _new_node() -> Dict[str, Any]:
+    return {"static": {}, "param": None, "routes": {}}
+
+def compile_routes(routes) -> Dict[str, Any]:
+    """Build a segment trie from ROUTES; done once at import time."""
+    root = _new_node()
+    for method, template, handler, validator in routes:
+        node = root
+        for seg in [p for p in template.split("/") if p]:
+            if seg.startswith("{") and seg.endswith("}"):
+                if node["param"] is None:
+                    node["param"] = (seg[1:-1], _new_node())
+                elif node["param"][0] != seg[1:-1]:
+                    raise ValueError(f"conflicting placeholder in route {template}")
+                node = node["param"][1]
+            else:
+                node = node["static"].setdefault(seg, _new_node())
+        node["routes"][method] = {"handler": handler, "validator": validator, "template": template}
+    return root
+
+def _match(
+    node: Dict[str, Any],
+    parts: List[str],
+    i: int,
+    method: str,
+    params: Dict[str, str],
+    allowed: set,
+) -> Optional[Dict[str, Any]]:
+    if i == len(parts):
+        allowed.update(node["routes"])
+        return node["routes"].get(method)
+    child = node["static"].get(parts[i])
+    if child is not None:
+        found = _match(child, parts, i + 1, method, params, allowed)
+        if found:
+            return found
+    if node["param"] is not None:
+        name, child = node["param"]
+        params[name] = parts[i]
+        found = _match(child, parts, i + 1, method, params, allowed)
+        if found:
+            return found
+        params.pop(name, None)
+    return None
+
+def match_route(
+    method: str, parts: List[str]
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, str], set]:
+    """Return (route entry, path params, methods allowed on this path)."""
+    params: Dict[str, str] = {}
+    allowed: set = set()
+    found = _match(ROUTE_TREE, parts, 0, method, params, allowed)
+    return found, params, allowed
+
+ROUTE_TREE = compile_routes(ROUTES)
+
+def route(event: Dict[str, Any]) -> Dict[str, Any]:
+    request_context = event.get("requestContext") or {}
+    http_ctx = request_context.get("http") or {}
+
+    method = event.get("httpMethod") or http_ctx.get("method", "")
+
+    raw_path = (
+        event.get("rawPath")
+        or event.get("path")
+        or http_ctx.get("path")
+        or "/"
     )
 
     logger.info("Routing method=%s path=%s", method, raw_path)
@@ -394,105 +2785,39 @@ def route(event: Dict[str, Any]) -> Dict[str, Any]:
     if not parts:
         return make_response(404, {"error": "no_resource_in_path"})
 
-    resource = parts[0]  # forms | cases | messages | appointments | services
-
-    # POST /files/upload  -> get presigned URL
-    if resource == "files" and len(parts) == 2 and parts[1] == "upload" and method == "POST":
-        return create_presigned_upload(event)
-
-    # GET /files/download/{id}
-    if resource == "files" and len(parts) == 3 and parts[1] == "download" and method == "GET":
-        return create_presigned_download(event)
-
-    try:
-        # POST /{resource}
-        if method == "POST" and len(parts) == 1:
-            payload = parse_json_body(event)
-
-            if resource == "forms":
-                if not payload.get("name") or not payload.get("email"):
-                    return make_response(400, {"error": "name and email required for forms"})
-            if resource == "cases":
-                if not payload.get("case_number") or not payload.get("title"):
-                    return make_response(400, {"error": "case_number and title required for cases"})
-            if resource == "messages":
-                if not payload.get("sender") or not payload.get("recipient") or not payload.get("body"):
-                    return make_response(400, {"error": "sender, recipient, body required for messages"})
-            if resource == "appointments":
-                if not payload.get("client") or not payload.get("datetime"):
-                    return make_response(400, {"error": "client and datetime required for appointments"})
-            if resource == "services":
-                if not payload.get("name"):
-                    return make_response(400, {"error": "name required for services"})
-            if resource == "files":
-                if not payload.get("title") or not payload.get("type") or not payload.get("file_url"):
-                    return make_response(400,{"error": "title, type and file_url required for files"})
-
-            created = create_resource_item(resource, payload)
-            return make_response(201, created)
-
-        # GET /{resource}
-        if method == "GET" and len(parts) == 1:
-            qs = event.get("queryStringParameters") or {}
-            limit = int(qs.get("limit", "50"))
-            last = qs.get("last")
-            items, last_key = list_resource_items(resource, limit=limit, last=last)
-            # FILTER SOFT-DELETED ITEMS (ONLY FOR FORMS)
-            if resource == "forms":
-                items = [item for item in items if not item.get("is_deleted", False)]
+    entry, params, allowed = match_route(method, parts)
+    if entry is None:
+        if allowed:
             return make_response(
-                200,
-                {"items": items, "last": json.dumps(last_key) if last_key else None},
+                405,
+                {"error": "method_not_allowed", "method": method, "path": raw_path},
+                {"Allow": ",".join(sorted(allowed))},
             )
-
-        # GET /{resource}/{id}
-        if method == "GET" and (len(parts) == 2 or path_params.get("id")):
-            item_id = path_params.get("id") or parts[1]
-            item = get_resource_item(resource, item_id)
-            if not item:
-                return make_response(404, {"error": "not_found"})
-            return make_response(200, item)
-
-        # PATCH /{resource}/{id}/read
-        if method == "PATCH" and (
-            (len(parts) >= 3 and parts[2] == "read")
-            or (path_params.get("id") and parts[-1] == "read")
-        ):
-            if path_params.get("id"):
-                item_id = path_params["id"]
-            else:
-                item_id = parts[1]
-            payload = parse_json_body(event)
-            if "read" not in payload or not isinstance(payload["read"], bool):
-                return make_response(400, {"error": "'read' boolean required in body"})
-            updated = update_read_flag(resource, item_id, payload["read"])
-            if not updated:
-                return make_response(404, {"error": "not_found"})
-            return make_response(200, updated)
-
-        # PUT /{resource}/{id}
-        if method == "PUT" and (len(parts) == 2 or path_params.get("id")):
-            item_id = path_params.get("id") or parts[1]
-            updates = parse_json_body(event)
-            if not updates:
-                return make_response(400, {"error": "no_update_fields_provided"})
-            updated = partial_update_item(resource, item_id, updates)
-            if not updated:
-                return make_response(404, {"error": "not_found_or_no_change"})
-            return make_response(200, updated)
-
-        # DELETE /{resource}/{id}
-        if method == "DELETE" and (len(parts) == 2 or path_params.get("id")):
-            item_id = path_params.get("id") or parts[1]
-            deleted = delete_resource_item(resource, item_id)
-            if not deleted:
-                return make_response(404, {"error": "not_found"})
-            return make_response(204, None)
-
         return make_response(
             404, {"error": "route_not_found", "method": method, "path": raw_path}
         )
 
+    # Oversized bodies are refused before they are parsed or written.
+    if len(event.get("body") or "") > MAX_BODY_BYTES:
+        return make_response(413, {"error": "payload_too_large", "max_bytes": MAX_BODY_BYTES})
+
+    req = {
+        "event": event,
+        "method": method,
+        "path": raw_path,
+        "parts": parts,
+        "params": params,
+        "qs": event.get("queryStringParameters") or {},
+        "body": parse_json_body(event) if method in ("POST", "PUT", "PATCH") else {},
+    }
+
+    try:
+        if entry["validator"]:
+            error = entry["validator"](req)
+            if error:
+                return make_response(400, {"error": error})
+        return entry["handler"](req)
+
     except ValueError as ve:
         logger.exception("ValueError in route")
         return make_response(400, {"error": str(ve)})
@@ -507,6 +2832,1017 @@ def route(event: Dict[str, Any]) -> Dict[str, Any]:
             500, {"error": "internal_server_error", "message": str(ex)}
         )
 
+# -------------------------
+# Batch operations
+# -------------------------
+class RateLimiter:
+    """Token bucket used by bulk jobs to stay under a table's capacity."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0) -> None:
+        """Take `n` tokens. A charge above the bucket size waits for a full
+        bucket and leaves the rest as debt, which later callers wait out."""
+        need = min(n, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= need:
+                    self.tokens -= n
+                    return
+                wait = (need - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def settle(self, delta: float) -> None:
+        """Correct an earlier charge once the real cost is known: a positive
+        delta adds debt, a negative one refunds tokens."""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+def _backoff(attempt: int) -> None:
+    # Full jitter: sleep a random slice of an exponentially growing window.
+    time.sleep(random.uniform(0, min(2.0, 0.05 * (2 ** attempt))))
+
+def batch_write_items(
+    resource: str,
+    creates: List[Dict[str, Any]],
+    deletes: List[str],
+    create_ids: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Create and delete many items with BatchWriteItem.
+
+    Returns one result per requested operation, in request order. Soft-delete
+    resources cannot be tombstoned through BatchWriteItem, so their deletes
+    fall back to delete_resource_item(). `create_ids`, when given, supplies
+    pre-reserved ids for `creates`, position by position.
+    """
+    table = choose_table(resource)
+    results: List[Dict[str, Any]] = []
+    requests: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    created: Dict[str, Dict[str, Any]] = {}
+
+    for pos, payload in enumerate(creates):
+        if not isinstance(payload, dict):
+            results.append({"op": "create", "status": "failed", "error": "invalid_item"})
+            continue
+        try:
+            item = build_resource_item(resource, payload, create_ids[pos] if create_ids else None)
+            if resource in CALENDAR_SPECS:
+                # Checked against stored slots only, not the rest of the batch.
+                check_slot(resource, item)
+        except (ValueError, SlotConflict) as e:
+            results.append({"op": "create", "status": "failed", "error": str(e)})
+            continue
+        result = {"op": "create", "id": item["id"], "status": "ok"}
+        results.append(result)
+        requests.append((result, {"PutRequest": {"Item": item}}))
+        created[item["id"]] = item
+
+    for item_id in deletes:
+        result = {"op": "delete", "id": str(item_id), "status": "ok"}
+        results.append(result)
+        if resource in SOFT_DELETE_RESOURCES:
+            try:
+                delete_resource_item(resource, str(item_id))
+            except ClientError as ce:
+                result.update(status="failed", error=str(ce))
+            continue
+        requests.append((result, {"DeleteRequest": {"Key": {"id": str(item_id)}}}))
+
+    # Reserved ids (batch uploads) may already have a row from the S3
+    # ingester: keep its version moving forward and do not count it again.
+    existing: Dict[str, Dict[str, Any]] = {}
+    if create_ids and created:
+        found, _, _ = batch_get_items(resource, list(created))
+        existing = {row["id"]: row for row in found}
+        for item_id, row in existing.items():
+            created[item_id]["version"] = int(row.get("version") or 0) + 1
+
+    unprocessed = write_batch_requests(table.table_name, [req for _, req in requests])
+    for result, req in requests:
+        if req in unprocessed:
+            result.update(status="failed", error="unprocessed")
+
+    READ_CACHE.invalidate_resource(resource)
+    ok = [r for r in results if r["status"] == "ok"]
+    # BatchWriteItem returns no old images, so hard deletes here are left to
+    # recount_dashboard().
+    deltas: Dict[str, int] = defaultdict(int)
+    for r in ok:
+        if r["op"] != "create":
+            continue
+        # An overwritten row swaps its contribution rather than adding one.
+        for name, n in counter_deltas(resource, created[r["id"]]).items():
+            deltas[name] += n
+        if r["id"] in existing:
+            for name, n in counter_deltas(resource, existing[r["id"]], -1).items():
+                deltas[name] += n
+    bump_counters(deltas)
+    for r in ok:
+        if r["op"] == "create":
+            record_audit(resource, r["id"], "CREATE", created[r["id"]].get("updated_by", "system"))
+        elif resource not in SOFT_DELETE_RESOURCES:
+            record_audit(resource, r["id"], "DELETE", "admin")
+    index_documents(
+        resource,
+        [created[r["id"]] for r in ok if r["op"] == "create"],
+        deleted_ids=[r["id"] for r in ok if r["op"] == "delete" and resource not in SOFT_DELETE_RESOURCES],
+    )
+    logger.info(
+        "Batch write on %s: %d creates, %d deletes, %d failed",
+        table.table_name,
+        len(creates),
+        len(deletes),
+        sum(1 for r in results if r["status"] != "ok"),
+    )
+    return results
+
+def write_batch_requests(name: str, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Send Put/DeleteRequests in BATCH_WRITE_CHUNK calls with jittered retries.
+
+    Returns the requests still unprocessed after BATCH_MAX_ATTEMPTS.
+    """
+    failed: List[Dict[str, Any]] = []
+    for start in range(0, len(requests), BATCH_WRITE_CHUNK):
+        pending = requests[start:start + BATCH_WRITE_CHUNK]
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            resp = get_dynamodb().batch_write_item(RequestItems={name: pending})
+            pending = resp.get("UnprocessedItems", {}).get(name, [])
+            if not pending:
+                break
+            _backoff(attempt)
+        failed.extend(pending)
+    return failed
+
+def batch_get_items(
+    resource: str, ids: List[str]
+) -> Tuple[List[Dict[str, Any]], List[str], List[str]]:
+    """Fetch many items with BatchGetItem.
+
+    Returns (items in request order, missing ids, ids still unprocessed after
+    retries).
+    """
+    name = table_name(resource)
+    unique_ids = list(dict.fromkeys(ids))
+    found: Dict[str, Dict[str, Any]] = {}
+    unprocessed: List[str] = []
+
+    for start in range(0, len(unique_ids), BATCH_GET_CHUNK):
+        keys = [{"id": {"S": i}} for i in unique_ids[start:start + BATCH_GET_CHUNK]]
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            resp = get_dynamodb_client().batch_get_item(RequestItems={name: {"Keys": keys}})
+            for wire in resp.get("Responses", {}).get(name, []):
+                item = item_from_wire(wire)
+                found[item["id"]] = item
+            keys = resp.get("UnprocessedKeys", {}).get(name, {}).get("Keys", [])
+            if not keys:
+                break
+            _backoff(attempt)
+        unprocessed.extend(k["id"]["S"] for k in keys)
+
+    items = [found[i] for i in unique_ids if i in found]
+    missing = [i for i in unique_ids if i not in found and i not in unprocessed]
+    logger.info(
+        "Batch get on %s: %d found, %d missing, %d unprocessed",
+        name,
+        len(items),
+        len(missing),
+        len(unprocessed),
+    )
+    return items, missing, unprocessed
+
+def bulk_update_field(
+    resource: str,
+    ids: List[str],
+    field: str,
+    value: Any,
+    limiter: Optional[RateLimiter] = None,
+) -> List[Dict[str, Any]]:
+    """Set `field` on many items, one TransactWriteItems call per chunk.
+
+    Each update is conditioned on attribute_exists(id) so unknown ids are
+    reported as not_found instead of creating ghost items; soft-deleted
+    items are reported the same way and left untouched. When a
+    transaction is cancelled, the ids that caused it are dropped and the
+    rest of the chunk is retried.
+
+    Status changes on calendar resources can re-occupy a slot, so they go
+    through partial_update_item() one by one and get its conflict check.
+    """
+    table = choose_table(resource)
+    limiter = limiter or RateLimiter(BULK_WRITE_RATE)
+    if resource in CALENDAR_SPECS and field == "status":
+        return [_bulk_booking_status(resource, item_id, value, limiter) for item_id in dict.fromkeys(ids)]
+    wire_value = {"BOOL": value} if isinstance(value, bool) else {"S": str(value)}
+    outcome: Dict[str, Dict[str, Any]] = {}
+    changed: List[str] = []
+    unique_ids = list(dict.fromkeys(ids))
+    # Only items whose value actually changes are written, so the changed
+    # ids drive the counters. A missing boolean reads as false.
+    condition = "attribute_exists(id) AND " + (
+        "#f <> :v" if value is False else "(attribute_not_exists(#f) OR #f <> :v)"
+    )
+    values = {":v": wire_value, ":one": {"N": "1"}}
+    if resource in SOFT_DELETE_RESOURCES:
+        condition += " AND (attribute_not_exists(is_deleted) OR is_deleted = :false)"
+        values[":false"] = {"BOOL": False}
+
+    for start in range(0, len(unique_ids), TRANSACT_CHUNK):
+        pending = unique_ids[start:start + TRANSACT_CHUNK]
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if not pending:
+                break
+            updated_at = now_iso()
+            transact = [
+                {
+                    "Update": {
+                        "TableName": table.table_name,
+                        "Key": {"id": {"S": item_id}},
+                        "UpdateExpression": "SET #f = :v, updated_at = :u ADD version :one",
+                        "ConditionExpression": condition,
+                        "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+                        "ExpressionAttributeNames": {"#f": field},
+                        "ExpressionAttributeValues": dict(values, **{":u": {"S": updated_at}}),
+                    }
+                }
+                for item_id in pending
+            ]
+            # Transactional writes cost two WCU per item.
+            limiter.acquire(2 * len(pending))
+            try:
+                get_dynamodb_client().transact_write_items(TransactItems=transact)
+            except ClientError as ce:
+                if ce.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                    raise
+                reasons = ce.response.get("CancellationReasons") or []
+                retry: List[str] = []
+                for item_id, reason in zip(pending, reasons):
+                    code = reason.get("Code", "None")
+                    if code == "ConditionalCheckFailed":
+                        # The old image is only returned when the item exists.
+                        old = reason.get("Item")
+                        outcome[item_id] = (
+                            {"id": item_id, "status": "ok", "unchanged": True}
+                            if old and not old.get("is_deleted", {}).get("BOOL")
+                            else {"id": item_id, "status": "not_found"}
+                        )
+                    elif code == "None" or code in ("ThrottlingError", "TransactionConflict"):
+                        retry.append(item_id)
+                    else:
+                        outcome[item_id] = {"id": item_id, "status": "failed", "error": code}
+                if len(retry) == len(pending):
+                    # Nothing to drop: throttled or contended, so back off.
+                    _backoff(attempt)
+                pending = retry
+                continue
+            for item_id in pending:
+                outcome[item_id] = {"id": item_id, "status": "ok"}
+            changed.extend(pending)
+            pending = []
+        for item_id in pending:
+            outcome[item_id] = {"id": item_id, "status": "failed", "error": "retries_exhausted"}
+
+    READ_CACHE.invalidate_resource(resource)
+    results = [outcome[i] for i in unique_ids]
+    for item_id in changed:
+        record_audit(resource, item_id, "BULK_UPDATE", "admin", {field: value})
+    if field == "read" and DASHBOARD_COUNTERS.get(resource, {}).get("unread"):
+        bump_counters({f"{resource}#unread": (-1 if value else 1) * len(changed)})
+    logger.info(
+        "Bulk set %s on %s: %d ids, %d ok",
+        field,
+        table.table_name,
+        len(results),
+        sum(1 for r in results if r["status"] == "ok"),
+    )
+    return results
+
+def _bulk_booking_status(resource: str, item_id: str, value: Any, limiter: RateLimiter) -> Dict[str, Any]:
+    limiter.acquire(2)  # consistent read plus the conditional write
+    try:
+        updated = partial_update_item(resource, item_id, {"status": value, "updated_by": "admin"})
+    except SlotConflict as sc:
+        return {"id": item_id, "status": "failed", "error": "slot_conflict", "conflicts": sc.conflicts}
+    except VersionConflict:
+        return {"id": item_id, "status": "failed", "error": "version_conflict"}
+    return {"id": item_id, "status": "ok"} if updated else {"id": item_id, "status": "not_found"}
+
+def collect_ids(resource: str, filters: Dict[str, str], cap: int) -> Tuple[List[str], bool]:
+    """Page through a filtered listing; returns (ids, truncated)."""
+    ids: List[str] = []
+    cursor: Optional[str] = None
+    while len(ids) < cap:
+        items, cursor = list_resource_items(
+            resource, limit=min(100, cap - len(ids)), last=cursor, filters=filters
+        )
+        ids.extend(item["id"] for item in items)
+        if not cursor:
+            return ids, False
+    return ids, cursor is not None
+
+# -------------------------
+# Parallel scan
+# -------------------------
+def scan_read_rate(resource: str) -> float:
+    """RCU per second a scan may consume, derived from the table's capacity."""
+    try:
+        table = get_dynamodb_client().describe_table(TableName=table_name(resource))["Table"]
+    except ClientError:
+        logger.exception("describe_table failed; using SCAN_READ_RATE")
+        return SCAN_READ_RATE
+    provisioned = table.get("ProvisionedThroughput", {}).get("ReadCapacityUnits") or 0
+    if not provisioned:
+        return SCAN_READ_RATE
+    return max(1.0, provisioned * SCAN_CAPACITY_SHARE)
+
+def new_scan_checkpoint(segments: int) -> Dict[str, Any]:
+    """Fresh checkpoint: per-segment LastEvaluatedKey and completion flag."""
+    return {
+        "total_segments": segments,
+        "segments": {str(s): {"last": None, "done": False} for s in range(segments)},
+    }
+
+def _scan_segment(
+    name: str,
+    segment: int,
+    state: Dict[str, Any],
+    limiter: RateLimiter,
+    scan_kwargs: Dict[str, Any],
+    on_page,
+    stop: threading.Event,
+) -> None:
+    read_page = _wire_reader("scan", name)
+    kwargs = dict(
+        scan_kwargs,
+        Segment=segment,
+        TotalSegments=state["total_segments"],
+        ReturnConsumedCapacity="TOTAL",
+    )
+    progress = state["segments"][str(segment)]
+    if progress["last"]:
+        kwargs["ExclusiveStartKey"] = progress["last"]
+    # Scans are charged after the fact; reserve a page's worth (1 MB of
+    # eventually consistent reads, then the previous page's cost) and settle
+    # up against what was reported.
+    estimate = 128.0
+    while not progress["done"] and not stop.is_set():
+        limiter.acquire(estimate)
+        resp = read_page(**kwargs)
+        consumed = float(resp.get("ConsumedCapacity", {}).get("CapacityUnits") or estimate)
+        limiter.settle(consumed - estimate)
+        estimate = max(1.0, consumed)
+        last_key = resp.get("LastEvaluatedKey")
+        on_page(segment, resp["Items"], last_key)
+        if not last_key:
+            break
+        kwargs["ExclusiveStartKey"] = last_key
+
+def _run_segments(
+    resource: str,
+    on_page,
+    segments: Optional[int],
+    checkpoint: Optional[Dict[str, Any]],
+    read_rate: Optional[float],
+    scan_kwargs: Dict[str, Any],
+    stop: threading.Event,
+) -> Tuple[Dict[str, Any], ThreadPoolExecutor, List[Any]]:
+    name = table_name(resource)
+    state = checkpoint or new_scan_checkpoint(segments or SCAN_SEGMENTS)
+    if segments and segments != state["total_segments"]:
+        raise ValueError("segments does not match the checkpoint's total_segments")
+    limiter = RateLimiter(read_rate or scan_read_rate(resource))
+    pending = [int(s) for s, p in state["segments"].items() if not p["done"]]
+    pool = ThreadPoolExecutor(max_workers=max(1, len(pending)), thread_name_prefix="scan")
+    futures = [
+        pool.submit(_scan_segment, name, s, state, limiter, scan_kwargs, on_page, stop)
+        for s in pending
+    ]
+    return state, pool, futures
+
+def _record_page(
+    state: Dict[str, Any],
+    lock: threading.Lock,
+    segment: int,
+    last_key: Optional[Dict[str, Any]],
+    save_checkpoint,
+) -> None:
+    with lock:
+        progress = state["segments"][str(segment)]
+        progress["last"] = last_key
+        progress["done"] = last_key is None
+        if save_checkpoint:
+            save_checkpoint(state)
+
+def parallel_scan(
+    resource: str,
+    process,
+    segments: Optional[int] = None,
+    checkpoint: Optional[Dict[str, Any]] = None,
+    save_checkpoint=None,
+    read_rate: Optional[float] = None,
+    **scan_kwargs: Any,
+) -> Dict[str, Any]:
+    """Scan a table with Segment/TotalSegments workers, calling process(item).
+
+    process runs on the worker threads, so it must be thread-safe. A segment's
+    LastEvaluatedKey is recorded only after every item of the page has been
+    processed; pass the saved state back as `checkpoint` to resume. scan_kwargs
+    (FilterExpression, ProjectionExpression, ...) use plain values, as in
+    list_resource_items.
+    """
+    lock = threading.Lock()
+    stop = threading.Event()
+    counts = {"items": 0, "pages": 0}
+    state: Dict[str, Any] = {}
+
+    def on_page(segment: int, items: List[Dict[str, Any]], last_key) -> None:
+        for item in items:
+            process(item)
+        with lock:
+            counts["items"] += len(items)
+            counts["pages"] += 1
+        _record_page(state, lock, segment, last_key, save_checkpoint)
+
+    run_state, pool, futures = _run_segments(
+        resource, on_page, segments, checkpoint, read_rate, scan_kwargs, stop
+    )
+    state.update(run_state)
+    try:
+        for future in futures:
+            future.result()
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        pool.shutdown(wait=True)
+    return {"resource": resource, "checkpoint": state, **counts}
+
+def iter_parallel_scan(
+    resource: str,
+    segments: Optional[int] = None,
+    checkpoint: Optional[Dict[str, Any]] = None,
+    save_checkpoint=None,
+    read_rate: Optional[float] = None,
+    **scan_kwargs: Any,
+) -> Iterator[Dict[str, Any]]:
+    """Generator form of parallel_scan(): items arrive in no particular order.
+
+    Pages are handed over through a bounded queue, so slow consumers throttle
+    the workers instead of buffering the table. A segment's checkpoint moves
+    forward once the consumer has taken all of the page's items.
+    """
+    lock = threading.Lock()
+    stop = threading.Event()
+    pages: "queue.Queue[Any]" = queue.Queue(maxsize=2 * (segments or SCAN_SEGMENTS))
+
+    def on_page(segment: int, items: List[Dict[str, Any]], last_key) -> None:
+        while not stop.is_set():
+            try:
+                pages.put((segment, items, last_key), timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    state, pool, futures = _run_segments(
+        resource, on_page, segments, checkpoint, read_rate, scan_kwargs, stop
+    )
+    try:
+        while True:
+            try:
+                segment, items, last_key = pages.get(timeout=0.1)
+            except queue.Empty:
+                # Workers enqueue before finishing, so all-done plus an empty
+                # queue means every page has been consumed.
+                if all(f.done() for f in futures) and pages.empty():
+                    break
+                continue
+            yield from items
+            _record_page(state, lock, segment, last_key, save_checkpoint)
+        for future in futures:
+            future.result()
+    finally:
+        stop.set()
+        pool.shutdown(wait=True)
+
+def save_scan_checkpoint(key: str, state: Dict[str, Any]) -> None:
+    """Persist a scan checkpoint to FILES_BUCKET (e.g. from save_checkpoint)."""
+    get_s3().put_object(Bucket=FILES_BUCKET, Key=key, Body=encode_body(state).encode("utf-8"))
+
+def load_scan_checkpoint(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        body = get_s3().get_object(Bucket=FILES_BUCKET, Key=key)["Body"].read()
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+    return json.loads(body)
+
+# -------------------------
+# Exports
+# -------------------------
+def iter_resource_items(
+    resource: str,
+    filters: Optional[Dict[str, str]] = None,
+    fields: Optional[List[str]] = None,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Yield every live item of a resource, one Query page at a time."""
+    cursor: Optional[str] = None
+    while True:
+        items, cursor = list_resource_items(
+            resource, limit=page_size, last=cursor, filters=filters, fields=fields
+        )
+        yield from items
+        if not cursor:
+            return
+
+def export_columns(resource: str, fields: Optional[List[str]]) -> List[str]:
+    if fields:
+        return fields
+    schema_fields = list(RESOURCE_SCHEMAS[resource].get("fields", {}))
+    return list(dict.fromkeys(["id", "created_at", *schema_fields, "status", "read", "updated_at"]))
+
+def format_ndjson(items: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for item in items:
+        yield (encode_body(item) + "\n").encode("utf-8")
+
+def format_csv(items: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for item in items:
+        writer.writerow(
+            [
+                v if isinstance(v, str) else encode_body(v)
+                for v in (item.get(c, "") for c in columns)
+            ]
+        )
+        if buf.tell() >= 64 * 1024:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+def upload_stream(chunks: Iterable[bytes], key: str, content_type: str) -> int:
+    """Write a byte stream to S3 as a multipart upload; returns bytes written."""
+    s3 = get_s3()
+    upload_id: Optional[str] = None
+    parts: List[Dict[str, Any]] = []
+    buf = bytearray()
+    total = 0
+    try:
+        for chunk in chunks:
+            buf += chunk
+            total += len(chunk)
+            if len(buf) >= EXPORT_PART_BYTES:
+                if upload_id is None:
+                    upload_id = s3.create_multipart_upload(
+                        Bucket=FILES_BUCKET, Key=key, ContentType=content_type
+                    )["UploadId"]
+                part = s3.upload_part(
+                    Bucket=FILES_BUCKET,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=len(parts) + 1,
+                    Body=bytes(buf),
+                )
+                parts.append({"PartNumber": len(parts) + 1, "ETag": part["ETag"]})
+                buf.clear()
+
+        if upload_id is None:
+            # Small export: a single PUT is cheaper than a multipart round trip.
+            s3.put_object(Bucket=FILES_BUCKET, Key=key, Body=bytes(buf), ContentType=content_type)
+            return total
+        if buf:
+            part = s3.upload_part(
+                Bucket=FILES_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=len(parts) + 1,
+                Body=bytes(buf),
+            )
+            parts.append({"PartNumber": len(parts) + 1, "ETag": part["ETag"]})
+        s3.complete_multipart_upload(
+            Bucket=FILES_BUCKET, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+        return total
+    except Exception:
+        if upload_id is not None:
+            s3.abort_multipart_upload(Bucket=FILES_BUCKET, Key=key, UploadId=upload_id)
+        raise
+
+def export_to_s3(
+    resource: str,
+    fmt: str,
+    filters: Optional[Dict[str, str]] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Stream a resource into FILES_BUCKET and return a presigned download URL."""
+    table_name(resource)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {sorted(EXPORT_FORMATS)}")
+
+    counted = {"items": 0}
+
+    def counting(items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for item in items:
+            counted["items"] += 1
+            yield item
+
+    items = counting(iter_resource_items(resource, filters=filters, fields=fields))
+    if fmt == "csv":
+        chunks = format_csv(items, export_columns(resource, fields))
+    else:
+        chunks = format_ndjson(items)
+
+    filename = f"{resource}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.{fmt}"
+    key = f"exports/{resource}/{uuid.uuid4().hex}/{filename}"
+    size = upload_stream(chunks, key, EXPORT_FORMATS[fmt])
+    url = export_download_url(key)
+    logger.info("Exported %d %s items (%d bytes) to %s", counted["items"], resource, size, key)
+    return {
+        "download_url": url,
+        "key": key,
+        "format": fmt,
+        "count": counted["items"],
+        "bytes": size,
+        "expires_in": EXPORT_URL_EXPIRY,
+    }
+
+def start_export(
+    resource: str,
+    fmt: str,
+    filters: Optional[Dict[str, Any]] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Record an export job and hand it to an async invocation of this
+    function; outside Lambda the job runs inline."""
+    table_name(resource)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {sorted(EXPORT_FORMATS)}")
+    filter_terms(resource, filters or {}, {}, {})  # reject bad keys now, not in the job
+    job: Dict[str, Any] = {
+        "id": str(uuid.uuid4()),
+        "kind": "export",
+        "resource": resource,
+        "format": fmt,
+        "filters": filters or {},
+        "status": "pending",
+        "created_at": now_iso(),
+        "expires_at": int(time.time()) + EXPORT_JOB_DAYS * 86400,
+    }
+    if fields:
+        job["fields"] = fields
+    uploads_table().put_item(Item=job)
+    function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+    if function_name:
+        try:
+            get_lambda().invoke(
+                FunctionName=function_name,
+                InvocationType="Event",
+                Payload=json.dumps({"export_job": job["id"]}).encode("utf-8"),
+            )
+        except Exception as e:
+            # Nothing will ever claim the job; close it so pollers stop.
+            logger.exception("Could not start export job %s", job["id"])
+            _finish_export_job(job["id"], {"status": "failed", "error": f"could not start: {e}"[:1000]})
+    else:
+        run_export_job(job["id"])
+    return export_job_view(get_upload_state(job["id"]))
+
+def run_export_job(job_id: str, context: Any = None) -> Dict[str, Any]:
+    """Async entry: claim a pending export job and run it to done/failed.
+
+    The claim records a deadline (start plus the time this invocation has
+    left) so a worker killed by the Lambda timeout shows up as failed.
+    """
+    started = datetime.now(timezone.utc)
+    budget = context.get_remaining_time_in_millis() / 1000 if context else EXPORT_JOB_TIMEOUT
+    try:
+        job = uploads_table().update_item(
+            Key={"id": job_id},
+            UpdateExpression="SET #s = :running, started_at = :t, deadline = :d",
+            ConditionExpression="kind = :export AND #s = :pending",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                ":running": "running",
+                ":pending": "pending",
+                ":export": "export",
+                ":t": started.isoformat(),
+                ":d": (started + timedelta(seconds=budget)).isoformat(),
+            },
+            ReturnValues="ALL_NEW",
+        )["Attributes"]
+    except ClientError as e:
+        if _conditional_failed(e):
+            logger.info("Export job %s is not pending; skipped", job_id)
+            return {"job_id": job_id, "status": "skipped"}
+        raise
+    try:
+        result = export_to_s3(job["resource"], job["format"], filters=job.get("filters"), fields=job.get("fields"))
+    except Exception as e:
+        # Not re-raised: a retried invocation would find the job claimed anyway.
+        logger.exception("Export job %s failed", job_id)
+        updates: Dict[str, Any] = {"status": "failed", "error": str(e)[:1000]}
+    else:
+        updates = {"status": "done", "key": result["key"], "count": result["count"], "bytes": result["bytes"]}
+    _finish_export_job(job_id, updates)
+    return {"job_id": job_id, "status": updates["status"]}
+
+def _finish_export_job(job_id: str, updates: Dict[str, Any]) -> None:
+    updates = dict(updates, finished_at=now_iso())
+    uploads_table().update_item(
+        Key={"id": job_id},
+        UpdateExpression="SET " + ", ".join(f"#k{i} = :v{i}" for i in range(len(updates))),
+        ExpressionAttributeNames={f"#k{i}": k for i, k in enumerate(updates)},
+        ExpressionAttributeValues={f":v{i}": v for i, v in enumerate(updates.values())},
+    )
+
+def export_job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    view = {
+        "job_id": job["id"],
+        "resource": job["resource"],
+        "format": job["format"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+    }
+    if job["status"] == "running" and job.get("deadline", "9") < now_iso():
+        # The worker was killed (timeout, OOM) before it could record that.
+        view["status"] = "failed"
+        view["error"] = "export did not finish within the function timeout"
+    elif job["status"] == "done":
+        view.update(
+            count=int(job["count"]),
+            bytes=int(job["bytes"]),
+            download_url=export_download_url(job["key"]),
+            expires_in=EXPORT_URL_EXPIRY,
+        )
+    elif job["status"] == "failed":
+        view["error"] = job.get("error")
+    return view
+
+def export_download_url(key: str) -> str:
+    filename = key.rsplit("/", 1)[-1]
+    return get_s3().generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": FILES_BUCKET,
+            "Key": key,
+            "ResponseContentDisposition": f'attachment; filename="{filename}"',
+        },
+        ExpiresIn=EXPORT_URL_EXPIRY,
+    )
+
+# -------------------------
+# S3 ingestion
+# -------------------------
+def s3_event_records(event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """S3 notification records from a direct S3 event or an SQS batch of them."""
+    records: List[Dict[str, Any]] = []
+    for record in event.get("Records", []):
+        if record.get("eventSource") == "aws:sqs":
+            body = json.loads(record.get("body") or "{}")
+            records.extend(body.get("Records", []))  # s3:TestEvent has none
+        else:
+            records.append(record)
+    return [r for r in records if r.get("eventSource") == "aws:s3"]
+
+def ingest_objects(keys: List[str]) -> Dict[str, Any]:
+    """Upsert files rows for objects under UPLOAD_PREFIX.
+
+    Existing rows keep their metadata and gain size/content type/checksum
+    through a SET of just those attributes (plus the version bump), so
+    edits made through the API meanwhile are kept. Unknown objects get a
+    new row titled after the filename, put only if the id is still free.
+    """
+    keys = list(dict.fromkeys(k for k in keys if k.startswith(UPLOAD_PREFIX)))
+    if not keys:
+        return {"ingested": 0, "created": 0, "missing": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+        metas = list(pool.map(object_metadata, keys))
+    ids = [file_id_for_key(k) for k in keys]
+    existing, _, unprocessed = batch_get_items("files", ids)
+    known = {item["id"] for item in existing}
+
+    stamp = now_iso()
+    jobs = []
+    missing = 0
+    for key, file_id, meta in zip(keys, ids, metas):
+        if meta is None or file_id in unprocessed:
+            # Deleted again before we got to it, or unreadable right now.
+            missing += 1
+            continue
+        meta["ingested_at"] = stamp
+        jobs.append((key, file_id, meta, file_id in known))
+
+    table = choose_table("files")
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+        outcomes = list(pool.map(lambda job: _ingest_row(table, *job), jobs))
+    READ_CACHE.invalidate_resource("files")
+    written = [(outcome, item) for outcome, item in outcomes if item is not None]
+    new_items = [item for outcome, item in written if outcome == "created"]
+    missing += sum(1 for outcome, _ in outcomes if outcome == "missing")
+    failed = sum(1 for outcome, _ in outcomes if outcome == "failed")
+    count_items("files", new_items)
+    index_documents("files", [item for _, item in written])
+    logger.info(
+        "Ingested %d objects into %s (%d new, %d missing, %d unwritten)",
+        len(written), table.table_name, len(new_items), missing, failed,
+    )
+    return {"ingested": len(written), "created": len(new_items), "missing": missing, "failed": failed}
+
+def _ingest_row(
+    table, key: str, file_id: str, meta: Dict[str, Any], known: bool
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Write one ingested object: ("created"|"updated", item), ("missing"|"failed", None)."""
+    try:
+        if not known:
+            filename = key[len(UPLOAD_PREFIX):].split("_", 1)[-1]
+            item = dict(
+                build_resource_item(
+                    "files",
+                    {"title": filename[:300], "type": "file", "file_url": FILES_URL_PREFIX + key, "source": "s3_event"},
+                    file_id,
+                ),
+                **meta,
+            )
+            try:
+                table.put_item(Item=item, ConditionExpression="attribute_not_exists(id)")
+                return "created", item
+            except ClientError as e:
+                if not _conditional_failed(e):
+                    raise
+                # Row created through the API since the read; update it instead.
+        resp = table.update_item(
+            Key={"id": file_id},
+            UpdateExpression="SET " + ", ".join(f"#m{i} = :m{i}" for i in range(len(meta))) + " ADD version :one",
+            ConditionExpression="attribute_exists(id)",
+            ExpressionAttributeNames={f"#m{i}": k for i, k in enumerate(meta)},
+            ExpressionAttributeValues={**{f":m{i}": v for i, v in enumerate(meta.values())}, ":one": 1},
+            ReturnValues="ALL_NEW",
+        )
+        return "updated", resp["Attributes"]
+    except ClientError as e:
+        if _conditional_failed(e):
+            return "missing", None  # row deleted since the read
+        logger.exception("Ingest write failed for %s", key)
+        return "failed", None
+
+def iter_bucket_objects(prefix: str) -> Iterator[Dict[str, Any]]:
+    """Inventory-style listing: every object under prefix, one page at a time."""
+    paginator = get_s3().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=FILES_BUCKET, Prefix=prefix):
+        yield from page.get("Contents", [])
+
+def reconcile_files(
+    grace_hours: float = RECONCILE_GRACE_HOURS, fix: bool = False, sample: int = 100
+) -> Dict[str, Any]:
+    """Compare UPLOAD_PREFIX objects with files rows.
+
+    Orphans are objects older than the grace period that no row points at;
+    dangling rows point at an UPLOAD_PREFIX key that no longer exists. With
+    `fix`, orphans are ingested and dangling rows get status "missing".
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    objects: Dict[str, bool] = {}  # key -> older than the grace period
+    for obj in iter_bucket_objects(UPLOAD_PREFIX):
+        objects[obj["Key"]] = obj["LastModified"] < cutoff
+
+    referenced = set()
+    dangling: List[str] = []
+    for row in iter_parallel_scan(
+        "files",
+        ProjectionExpression="#id, s3_key, file_url, is_deleted, #st",
+        ExpressionAttributeNames={"#id": "id", "#st": "status"},
+    ):
+        key = s3_key_for(row)
+        if not key or not key.startswith(UPLOAD_PREFIX):
+            continue
+        referenced.add(key)
+        if key not in objects and not row.get("is_deleted") and row.get("status") != "missing":
+            dangling.append(row["id"])
+
+    orphans = [k for k, old in objects.items() if old and k not in referenced]
+    result: Dict[str, Any] = {
+        "objects": len(objects),
+        "orphans": len(orphans),
+        "dangling": len(dangling),
+        "orphan_sample": orphans[:sample],
+        "dangling_sample": dangling[:sample],
+    }
+    if fix:
+        result["ingest"] = ingest_objects(orphans)
+        updates = bulk_update_field("files", dangling, "status", "missing") if dangling else []
+        result["marked_missing"] = sum(1 for r in updates if r["status"] == "ok")
+    logger.info("Reconciled files: %s", {k: v for k, v in result.items() if not k.endswith("_sample")})
+    return result
+
+# -------------------------
+# Maintenance jobs
+# -------------------------
+def backfill_resource_attr(resource: str) -> Dict[str, Any]:
+    """Set the constant "resource" attribute on items written without it.
+
+    Listings, exports and bulk filters read the resource-* index, which
+    only holds items carrying the attribute; run this once per table after
+    deploying the index.
+    """
+    table = choose_table(resource)
+    updated = 0
+    for item in iter_parallel_scan(
+        resource,
+        FilterExpression="attribute_not_exists(#r)",
+        ProjectionExpression="#id",
+        ExpressionAttributeNames={"#r": "resource", "#id": "id"},
+    ):
+        try:
+            table.update_item(
+                Key={"id": item["id"]},
+                UpdateExpression="SET #r = :r ADD version :one",
+                ConditionExpression="attribute_exists(id) AND attribute_not_exists(#r)",
+                ExpressionAttributeNames={"#r": "resource"},
+                ExpressionAttributeValues={":r": resource, ":one": 1},
+            )
+        except ClientError as e:
+            if not _conditional_failed(e):
+                raise
+            continue
+        updated += 1
+    READ_CACHE.invalidate_resource(resource)
+    logger.info("Backfilled resource attribute on %d items of %s", updated, table.table_name)
+    return {"resource": resource, "updated": updated}
+
+def compact_tombstones(
+    resource: str,
+    retention_days: int = TOMBSTONE_RETENTION_DAYS,
+    archive: bool = True,
+) -> Dict[str, Any]:
+    """Hard-delete soft-deleted items older than `retention_days`.
+
+    When `archive` is set the removed items are first written as NDJSON to
+    FILES_BUCKET under archive/<resource>/. Each delete is conditional on
+    the item still being an expired tombstone, so one restored or rewritten
+    since the scan is kept (and counted as skipped).
+    """
+    table = choose_table(resource)
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+    expired: List[Dict[str, Any]] = []
+    for item in iter_parallel_scan(
+        resource,
+        FilterExpression="#del = :true",
+        ExpressionAttributeNames={"#del": "is_deleted"},
+        ExpressionAttributeValues={":true": True},
+    ):
+        deleted_at = item.get("deleted_at") or item.get("updated_at") or ""
+        if deleted_at and deleted_at < cutoff:
+            expired.append(item)
+
+    archive_key = None
+    if expired and archive:
+        archive_key = f"archive/{resource}/{now_iso()[:10]}/{uuid.uuid4().hex}.ndjson"
+        body = "\n".join(encode_body(i) for i in expired)
+        get_s3().put_object(Bucket=FILES_BUCKET, Key=archive_key, Body=body.encode("utf-8"))
+
+    limiter = RateLimiter(BULK_WRITE_RATE)
+    deleted = 0
+    for item in expired:
+        limiter.acquire()
+        try:
+            table.delete_item(
+                Key={"id": item["id"]},
+                ConditionExpression="#del = :true AND (#da < :cutoff"
+                " OR (attribute_not_exists(#da) AND #ua < :cutoff))",
+                ExpressionAttributeNames={"#del": "is_deleted", "#da": "deleted_at", "#ua": "updated_at"},
+                ExpressionAttributeValues={":true": True, ":cutoff": cutoff},
+            )
+        except ClientError as e:
+            if not _conditional_failed(e):
+                raise
+            continue
+        deleted += 1
+    READ_CACHE.invalidate_resource(resource)
+
+    logger.info(
+        "Compacted %d tombstones from %s (skipped=%d, archive=%s)",
+        deleted,
+        table.table_name,
+        len(expired) - deleted,
+        archive_key,
+    )
+    return {
+        "resource": resource,
+        "deleted": deleted,
+        "skipped": len(expired) - deleted,
+        "archive_key": archive_key,
+    }
+
 # -------------------------
 # Lambda handler
 # -------------------------
@@ -516,4 +3852,86 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         event.get("httpMethod"),
         event.get("path") or event.get("rawPath"),
     )
-    return route(event)
\ No newline at end of file
+    if "export_job" in event:
+        # Async self-invocation from start_export().
+        return run_export_job(event["export_job"], context)
+    try:
+        return compress_response(event, route(event))
+    finally:
+        flush_audit()
+
+def audit_stream_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """DynamoDB Streams consumer for AUDIT_MODE=stream (NEW_AND_OLD_IMAGES)."""
+    from boto3.dynamodb.types import TypeDeserializer
+
+    # Decimal-typed values, as the resource-layer batch writer expects.
+    deserialize = TypeDeserializer().deserialize
+    resources = {schema["table"]: r for r, schema in RESOURCE_SCHEMAS.items()}
+    actions = {"INSERT": "CREATE", "MODIFY": "UPDATE", "REMOVE": "DELETE"}
+    events = []
+    for record in event.get("Records", []):
+        table = record.get("eventSourceARN", "").split(":table/")[-1].split("/")[0]
+        resource = resources.get(table)
+        if resource is None:
+            continue
+        data = record["dynamodb"]
+        new = {k: deserialize(v) for k, v in data.get("NewImage", {}).items()}
+        old = {k: deserialize(v) for k, v in data.get("OldImage", {}).items()}
+        action = actions[record["eventName"]]
+        if action == "UPDATE" and new.get("is_deleted") and not old.get("is_deleted"):
+            action = "DELETE"
+        changes = {k: v for k, v in new.items() if old.get(k) != v and k != "updated_at"} if old else None
+        item_id = (new or old).get("id") or deserialize(data["Keys"]["id"])
+        events.append(audit_event(resource, item_id, action, new.get("updated_by", "system"), changes))
+    unwritten = write_batch_requests(TABLE_AUDIT, [{"PutRequest": {"Item": e}} for e in events])
+    return {"recorded": len(events) - len(unwritten), "failed": len(unwritten)}
+
+def s3_ingest_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Entry point for ObjectCreated notifications on FILES_BUCKET (direct or via SQS)."""
+    keys = [
+        unquote_plus(r["s3"]["object"]["key"])
+        for r in s3_event_records(event)
+        if r.get("eventName", "").startswith("ObjectCreated")
+    ]
+    return ingest_objects(keys)
+
+def reconcile_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Scheduled (EventBridge) entry point for the uploads reconciler."""
+    try:
+        return reconcile_files(
+            grace_hours=float(event.get("grace_hours", RECONCILE_GRACE_HOURS)),
+            fix=bool(event.get("fix", False)),
+        )
+    finally:
+        flush_audit()
+
+def search_reindex_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Manual/scheduled entry point that rebuilds search indexes from the tables."""
+    resources = event.get("resources") or list(SEARCH_FIELDS.keys())
+    return {"results": [rebuild_search_index(r) for r in resources]}
+
+def dashboard_recount_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Scheduled (EventBridge) entry point that rebuilds the dashboard counters."""
+    return recount_dashboard()
+
+def calendar_backfill_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """One-off entry point that derives slot attributes on existing bookings."""
+    resources = event.get("resources") or list(CALENDAR_SPECS.keys())
+    return {"results": [backfill_calendar(r) for r in resources]}
+
+def resource_backfill_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """One-off entry point that makes pre-index items visible to listings."""
+    resources = event.get("resources") or list(RESOURCE_SCHEMAS.keys())
+    return {"results": [backfill_resource_attr(r) for r in resources]}
+
+def compaction_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Scheduled (EventBridge) entry point for tombstone compaction."""
+    resources = event.get("resources") or sorted(SOFT_DELETE_RESOURCES)
+    retention_days = int(event.get("retention_days", TOMBSTONE_RETENTION_DAYS))
+    archive = bool(event.get("archive", True))
+    return {
+        "results": [
+            compact_tombstones(r, retention_days=retention_days, archive=archive)
+            for r in resources
+        ]
+    }
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""Startup benchmark: module import time and first-request latency.
+
+Each run is a fresh interpreter, i.e. a simulated Lambda cold start. Reports
+the median over all runs of:
+  import     - `import lambda_function`
+  options    - first OPTIONS preflight through lambda_handler()
+  first_aws  - first choose_table() (boto3 import + resource + Table build;
+               no network call is made)
+and whether the preflight pulled boto3 in.
+
+    python tools/bench_cold_start.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = r"""
+import json, os, sys, time
+sys.path.insert(0, os.path.join(sys.argv[1], ".."))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-south-1")
+t0 = time.perf_counter()
+import lambda_function as lf
+t1 = time.perf_counter()
+lf.logger.disabled = True
+lf.lambda_handler({"httpMethod": "OPTIONS", "path": "/forms"}, None)
+t2 = time.perf_counter()
+boto3_loaded = "boto3" in sys.modules
+lf.choose_table("forms")
+t3 = time.perf_counter()
+print(json.dumps({
+    "import": t1 - t0,
+    "options": t2 - t1,
+    "first_aws": t3 - t2,
+    "boto3_after_options": boto3_loaded,
+}))
+"""
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, HERE],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+
+    for key in ("import", "options", "first_aws"):
+        median_ms = statistics.median(s[key] for s in samples) * 1000
+        print(f"{key:10} {median_ms:8.2f} ms")
+    print(f"boto3 loaded by OPTIONS: {any(s['boto3_after_options'] for s in samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Size and latency payoff of response compression on list payloads.
+
+For 50- and 500-item forms pages, reports the JSON size, the size actually
+sent through API Gateway (base64 of the compressed bytes), CPU time for
+compress_response(), and the transfer time saved on a slow mobile link.
+
+    python tools/bench_compression.py [link_kbit_per_s]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-south-1")
+
+import lambda_function as lf  # noqa: E402
+
+
+def item(i: int) -> dict:
+    return {
+        "id": f"0b9f2c7e-4f1a-4d8e-9b0e-{i:012d}",
+        "form_id": "civil-cases",
+        "name": f"Client {i}",
+        "email": f"client{i}@example.com",
+        "phone": "+91 98765 43210",
+        "case_type": "civil",
+        "message": f"Need advice on a property dispute, reference {i * 7919}. " * 4,
+        "status": "NEW",
+        "read": i % 2 == 0,
+        "created_at": f"2026-10-{i % 28 + 1:02d}T08:22:47.803950+00:00",
+    }
+
+
+def main() -> None:
+    kbit = float(sys.argv[1]) if len(sys.argv) > 1 else 1600.0  # ~ busy 3G
+    bytes_per_ms = kbit * 1000 / 8 / 1000
+    encodings = ["identity", "gzip"] + (["br"] if lf.brotli is not None else [])
+    print(f"link: {kbit:.0f} kbit/s  (brotli {'on' if lf.brotli else 'not installed'})")
+    for size in (50, 500):
+        body = {"items": [item(i) for i in range(size)], "last": None}
+        raw = len(lf.encode_body(body))
+        for enc in encodings:
+            event = {"headers": {"Accept-Encoding": enc}}
+
+            def run():
+                return lf.compress_response(event, lf.make_response(200, body))
+
+            runs = max(5, 2000 // size)
+            cpu_ms = timeit.timeit(run, number=runs) / runs * 1e3
+            sent = len(run()["body"])
+            print(
+                f"{size:4d} items {enc:9} json {raw:8d} B  sent {sent:8d} B  "
+                f"encode+compress {cpu_ms:6.2f} ms  transfer {sent / bytes_per_ms:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""CPU per list call: boto3 resource-layer decoding vs the wire converters.
+
+Builds a synthetic Query page in DynamoDB wire format (realistic forms
+items, with numbers, a nested audit map and a tags list) and times the
+post-network work of each read path:
+
+  resource  TypeDeserializer -> Decimal-typed dicts -> EnhancedJSONEncoder
+  client    item_from_wire   -> plain dicts         -> EnhancedJSONEncoder
+
+    python tools/bench_dynamodb_decode.py [items_per_page] [iterations]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-south-1")
+
+from boto3.dynamodb.types import TypeDeserializer  # noqa: E402
+
+import lambda_function as lf  # noqa: E402
+
+
+def wire_item(i: int) -> dict:
+    return {
+        "id": {"S": f"0b9f2c7e-4f1a-4d8e-9b0e-{i:012d}"},
+        "resource": {"S": "forms"},
+        "form_id": {"S": "civil-cases"},
+        "name": {"S": f"Client {i}"},
+        "email": {"S": f"client{i}@example.com"},
+        "phone": {"S": "+91 98765 43210"},
+        "case_type": {"S": "civil"},
+        "message": {"S": "Need advice on a property dispute. " * 8},
+        "status": {"S": "NEW"},
+        "read": {"BOOL": i % 2 == 0},
+        "priority": {"N": str(i % 5)},
+        "score": {"N": "0.75"},
+        "created_at": {"S": "2026-10-18T08:22:47.803950+00:00"},
+        "tags": {"L": [{"S": "property"}, {"S": "urgent"}]},
+        "audit": {
+            "M": {
+                "action_type": {"S": "CREATE"},
+                "updated_by": {"S": "system"},
+                "updated_at": {"S": "2026-10-18T08:22:47.803950+00:00"},
+            }
+        },
+    }
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    page = [wire_item(i) for i in range(size)]
+    deserializer = TypeDeserializer()
+
+    def resource_path() -> str:
+        items = [{k: deserializer.deserialize(v) for k, v in it.items()} for it in page]
+        return json.dumps({"items": items}, cls=lf.EnhancedJSONEncoder)
+
+    def client_path() -> str:
+        items = [lf.item_from_wire(it) for it in page]
+        return json.dumps({"items": items}, cls=lf.EnhancedJSONEncoder)
+
+    for name, fn in (("resource", resource_path), ("client", client_path)):
+        t = timeit.timeit(fn, number=n)
+        print(f"{name:9} {size:4d} items  {t / n * 1e3:7.3f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
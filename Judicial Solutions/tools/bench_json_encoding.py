@@ -0,0 +1,67 @@
+"""Response encoding benchmark over realistic 50- and 500-item list payloads.
+
+Compares, per make_response()-sized body:
+  json.dumps(cls=...)   the original per-call encoder construction
+  stdlib (reused)       the module's prebuilt EnhancedJSONEncoder
+  orjson                when installed
+
+Payloads use Decimal numbers, as returned by the boto3 resource layer, so
+the stdlib `default` hook is exercised the way it is in production.
+
+    python tools/bench_json_encoding.py [iterations]
+"""
+import decimal
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-south-1")
+
+import lambda_function as lf  # noqa: E402
+
+
+def item(i: int) -> dict:
+    return {
+        "id": f"0b9f2c7e-4f1a-4d8e-9b0e-{i:012d}",
+        "form_id": "civil-cases",
+        "name": f"Client {i}",
+        "email": f"client{i}@example.com",
+        "phone": "+91 98765 43210",
+        "case_type": "civil",
+        "message": "Need advice on a property dispute. " * 8,
+        "status": "NEW",
+        "read": i % 2 == 0,
+        "priority": decimal.Decimal(i % 5),
+        "score": decimal.Decimal("0.75"),
+        "created_at": "2026-10-18T08:22:47.803950+00:00",
+        "tags": ["property", "urgent"],
+        "audit": {"action_type": "CREATE", "updated_by": "system"},
+    }
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    encoders = {
+        "json.dumps(cls=...)": lambda b: json.dumps(b, cls=lf.EnhancedJSONEncoder),
+        "stdlib (reused)": lf._STDLIB_ENCODER.encode,
+    }
+    try:
+        import orjson
+
+        encoders["orjson"] = lambda b: orjson.dumps(b, default=lf._orjson_default).decode("utf-8")
+    except ImportError:
+        print("orjson not installed; skipping")
+
+    print(f"module backend: {lf.JSON_BACKEND}")
+    for size in (50, 500):
+        body = {"items": [item(i) for i in range(size)], "last": None}
+        for name, encode in encoders.items():
+            runs = max(1, n * 50 // size)
+            t = timeit.timeit(lambda: encode(body), number=runs)
+            print(f"{size:4d} items  {name:22} {t / runs * 1e3:8.3f} ms  {len(encode(body)):8d} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Micro-benchmark: per-request dispatch cost of the compiled route table.
+
+Measures match_route() alone (no handler, no AWS calls) for the paths the
+dashboard hits most, plus a full route() call for an OPTIONS preflight.
+
+    python tools/bench_routing.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-south-1")
+
+import lambda_function as lf  # noqa: E402
+
+CASES = [
+    ("GET", "/forms"),
+    ("GET", "/forms/0b9f2c7e-4f1a-4d8e-9b0e-2f6c1d3a5e77"),
+    ("PATCH", "/forms/0b9f2c7e-4f1a-4d8e-9b0e-2f6c1d3a5e77/read"),
+    ("PATCH", "/forms/read"),
+    ("POST", "/files/upload"),
+    ("GET", "/files/download/0b9f2c7e"),
+    ("POST", "/cases/batch"),
+    ("DELETE", "/nope/a/b/c"),
+]
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{'method':7} {'path':58} {'ns/op':>8}")
+    for method, path in CASES:
+        parts = [p for p in path.split("/") if p]
+        t = timeit.timeit(lambda: lf.match_route(method, parts), number=n)
+        print(f"{method:7} {path:58} {t / n * 1e9:8.0f}")
+
+    preflight = {"httpMethod": "OPTIONS", "path": "/forms"}
+    lf.logger.disabled = True
+    t = timeit.timeit(lambda: lf.route(preflight), number=n)
+    print(f"{'OPTIONS':7} {'/forms (full route())':58} {t / n * 1e9:8.0f}")
+
+
+if __name__ == "__main__":
+    main()